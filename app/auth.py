@@ -1,26 +1,95 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional
 
 from fastapi import Depends, HTTPException
 from fastapi.logger import logger
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import ValidationError
 from starlette import status
 
+from app.cache import LRUCache
+from app.metrics import observe_auth
+from app.hashing import PasswordHasher, hash_password, pwd_context, verify_and_update, verify_password
 from config import config
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
 
 class AuthService:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = pwd_context
+
+    # Кэш проверенных токенов: sha256(token) -> payload, запись живёт до `exp` токена
+    token_cache = LRUCache(maxsize=config.JWT_CACHE_SIZE)
+    revocation_checks: list[Callable[[dict], bool]] = []
+
+    @classmethod
+    def add_revocation_check(cls, check: Callable[[dict], bool]) -> None:
+        """
+        Зарегистрировать проверку отзыва токена.
+
+        Проверка получает payload и возвращает True, если токен отозван. Она вызывается при каждом
+        декодировании, в том числе при попадании в кэш, поэтому должна быть быстрой и синхронной.
+        """
+        cls.revocation_checks.append(check)
+
+    @classmethod
+    def revoke_token(cls, token: str) -> None:
+        """Удалить токен из кэша проверенных токенов"""
+        cls.token_cache.pop(hashlib.sha256(token.encode()).digest())
+
+    @staticmethod
+    def _token_type(payload: dict) -> str:
+        """
+        Тип токена из claim `typ`.
+
+        Токены, выпущенные до появления `typ`, различаются по claim семейства `fid`, который есть только
+        у refresh-токенов.
+        """
+        return payload.get("typ") or (REFRESH_TOKEN if "fid" in payload else ACCESS_TOKEN)
+
+    @classmethod
+    def _decode_token(cls, token: str, token_type: str = ACCESS_TOKEN) -> dict:
+        """
+        Проверить подпись, claims и тип токена.
+
+        Проверенные access-токены кэшируются. Refresh-токены одноразовые и в кэш не попадают.
+
+        **Ошибки**:
+        - `JWTError`: Если токен недействителен, истёк, отозван или имеет другой тип.
+        """
+        cacheable = config.JWT_CACHE_ENABLED and token_type == ACCESS_TOKEN
+        key = hashlib.sha256(token.encode()).digest() if cacheable else None
+        payload = cls.token_cache.get(key) if key is not None else None
+        if payload is None:
+            started = time.perf_counter()
+            try:
+                payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
+            finally:
+                observe_auth("jwt_decode", time.perf_counter() - started)
+            if cls._token_type(payload) != token_type:
+                raise JWTError(f"Expected {token_type} token")
+            exp = payload.get("exp")
+            if key is not None and exp is not None:
+                ttl = exp - time.time()
+                if ttl > 0:
+                    cls.token_cache.set(key, payload, ttl=ttl)
+        for check in cls.revocation_checks:
+            if check(payload):
+                if key is not None:
+                    cls.token_cache.pop(key)
+                raise JWTError("Token has been revoked")
+        return dict(payload)
 
     @classmethod
     async def get_current_user(cls, token: str = Depends(oauth2_scheme)):
         try:
-            payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
+            payload = cls._decode_token(token)
             username: str = payload.get("sub")
             if username is None:
                 raise HTTPException(
@@ -44,6 +113,28 @@ class AuthService:
     def get_password_hash(cls, password: str) -> str:
         return cls.pwd_context.hash(password)
 
+    @classmethod
+    async def verify_password_async(cls, plain_password: str, hashed_password: str) -> bool:
+        """Проверка пароля в пуле хеширования, не блокирующая event loop"""
+        return await PasswordHasher.run(verify_password, plain_password, hashed_password)
+
+    @classmethod
+    async def get_password_hash_async(cls, password: str) -> str:
+        """Хеширование пароля в пуле хеширования, не блокирующее event loop"""
+        return await PasswordHasher.run(hash_password, password)
+
+    @classmethod
+    async def verify_and_update_password_async(cls, plain_password: str,
+                                               hashed_password: str) -> tuple[bool, Optional[str]]:
+        """
+        Проверка пароля с возможной перегенерацией хеша.
+
+        **Возвращает**:
+        - `tuple[bool, Optional[str]]`: Результат проверки и новый хеш, если текущий устарел
+          (например, изменился `BCRYPT_ROUNDS`), иначе `None`.
+        """
+        return await PasswordHasher.run(verify_and_update, plain_password, hashed_password)
+
     @classmethod
     def create_access_token(cls, data: dict, expires_delta: Optional[timedelta] = None) -> str:
         to_encode = data.copy()
@@ -51,15 +142,16 @@ class AuthService:
             expire = datetime.utcnow() + expires_delta
         else:
             expire = datetime.utcnow() + timedelta(minutes=15)
-        to_encode.update({"exp": expire})
+        to_encode.update({"exp": expire, "typ": ACCESS_TOKEN})
+        started = time.perf_counter()
         encoded_jwt = jwt.encode(to_encode, config.SECRET_KEY, algorithm=config.ALGORITHM)
+        observe_auth("jwt_encode", time.perf_counter() - started)
         return encoded_jwt
 
     @classmethod
     def decode_access_token(cls, token: str) -> Optional[dict]:
         try:
-            payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
-            return payload
+            return cls._decode_token(token)
         except JWTError as e:
             logger.error(f"Token decoding failed: {str(e)}")
             return None
@@ -68,8 +160,10 @@ class AuthService:
     def create_refresh_token(cls, data: dict, expires_delta: timedelta) -> str:
         to_encode = data.copy()
         expire = datetime.utcnow() + expires_delta
-        to_encode.update({"exp": expire})
+        to_encode.update({"exp": expire, "typ": REFRESH_TOKEN})
+        started = time.perf_counter()
         encoded_jwt = jwt.encode(to_encode, config.SECRET_KEY, algorithm=config.ALGORITHM)
+        observe_auth("jwt_encode", time.perf_counter() - started)
         return encoded_jwt
 
     @classmethod
@@ -82,11 +176,10 @@ class AuthService:
 
         **Возвращает**:
         - `dict`: Полезная нагрузка токена, если декодирование успешно.
-        - `None`: Если токен недействителен или истёк.
+        - `None`: Если токен недействителен, истёк или не является refresh-токеном.
         """
         try:
-            payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
-            return payload
+            return cls._decode_token(token, REFRESH_TOKEN)
         except JWTError:
             return None
 
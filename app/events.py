@@ -0,0 +1,251 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Optional
+
+from fastapi import HTTPException
+from loguru import logger
+from redis.asyncio.client import PubSub
+from redis.exceptions import RedisError
+from starlette import status
+
+from config import config
+from database.redis import get_redis
+
+
+def sse_frame(event_type: str, data: str) -> str:
+    """Событие в формате Server-Sent Events"""
+    return f"event: {event_type}\ndata: {data}\n\n"
+
+
+RESYNC_FRAME = sse_frame("resync", json.dumps({"type": "resync"}))
+
+
+class TaskEventSubscriber:
+    """Подписка одного соединения: ограниченная очередь готовых SSE-кадров"""
+
+    __slots__ = ("user_id", "queue")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue[Optional[str]] = asyncio.Queue(maxsize=config.TASK_EVENTS_QUEUE_SIZE)
+
+    def push(self, frame: str) -> bool:
+        """
+        Положить событие в очередь, не блокируя общий цикл чтения из Redis.
+
+        Если клиент не успевает забирать события и очередь заполнена, накопленные события отбрасываются
+        и вместо них ставится событие `resync`: клиент должен догнать состояние через `GET /tasks/changes`.
+        Возвращает False, если события пришлось отбросить.
+        """
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_FRAME)
+            return False
+
+    def close(self) -> None:
+        """Завершить поток соединения: накопленные события отбрасываются, генератор получает None"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class TaskEventBroker:
+    """
+    Рассылка событий изменения задач через Redis pub/sub.
+
+    Обработчики публикуют событие в канал пользователя `tasks:events:{user_id}`. Каждый процесс держит одно
+    pub/sub-соединение и подписывается только на каналы пользователей, у которых в этом процессе есть открытые
+    соединения. Одна фоновая задача читает сообщения и раскладывает их по очередям подписчиков, поэтому
+    простаивающее соединение стоит одну небольшую очередь, а не отдельное соединение с Redis.
+    """
+
+    _subscribers: dict[int, set[TaskEventSubscriber]] = {}
+    _pubsub: Optional[PubSub] = None
+    _reader: Optional[asyncio.Task] = None
+    _lock: Optional[asyncio.Lock] = None
+
+    draining = False
+
+    connections = 0
+    published = 0
+    delivered = 0
+    dropped = 0
+    errors = 0
+
+    @staticmethod
+    def _channel(user_id: int) -> str:
+        return f"tasks:events:{user_id}"
+
+    @classmethod
+    async def publish(cls, user_id: int, event: dict[str, Any]) -> None:
+        """Опубликовать событие для всех соединений пользователя во всех процессах"""
+        try:
+            redis_conn = await get_redis()
+            await redis_conn.publish(cls._channel(user_id), json.dumps(event, ensure_ascii=False))
+            cls.published += 1
+        except RedisError as e:
+            cls.errors += 1
+            logger.warning(f"Task event publish failed for user {user_id}: {e}")
+
+    @classmethod
+    def check_capacity(cls) -> None:
+        """
+        Проверить, что процесс может принять ещё одно соединение.
+
+        **Ошибки**:
+        - 503: Если в процессе уже открыто `TASK_EVENTS_MAX_CONNECTIONS` соединений или процесс завершается.
+        """
+        if cls.draining or cls.connections >= config.TASK_EVENTS_MAX_CONNECTIONS:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many event subscriptions, try again later",
+                headers={"Retry-After": "5"},
+            )
+
+    @classmethod
+    async def subscribe(cls, user_id: int) -> TaskEventSubscriber:
+        """Зарегистрировать соединение пользователя, при необходимости подписавшись на его канал"""
+        if cls._lock is None:
+            cls._lock = asyncio.Lock()
+        subscriber = TaskEventSubscriber(user_id)
+        async with cls._lock:
+            if cls._pubsub is None:
+                redis_conn = await get_redis()
+                cls._pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+            if user_id not in cls._subscribers:
+                await cls._pubsub.subscribe(cls._channel(user_id))
+            cls._subscribers.setdefault(user_id, set()).add(subscriber)
+            cls.connections += 1
+            if cls._reader is None or cls._reader.done():
+                cls._reader = asyncio.create_task(cls._read(), name="task-events-reader")
+        return subscriber
+
+    @classmethod
+    def unsubscribe(cls, subscriber: TaskEventSubscriber) -> None:
+        """
+        Снять регистрацию соединения.
+
+        Вызывается и при отмене задачи отключившегося клиента, поэтому отписка от канала Redis после
+        последнего соединения пользователя выполняется в отдельной задаче.
+        """
+        subscribers = cls._subscribers.get(subscriber.user_id)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.remove(subscriber)
+        cls.connections -= 1
+        if not subscribers:
+            del cls._subscribers[subscriber.user_id]
+            asyncio.get_running_loop().create_task(cls._unsubscribe_channel(subscriber.user_id))
+
+    @classmethod
+    async def _unsubscribe_channel(cls, user_id: int) -> None:
+        async with cls._lock:
+            # Пока задача ждала блокировку, пользователь мог подключиться снова
+            if user_id in cls._subscribers or cls._pubsub is None:
+                return
+            try:
+                await cls._pubsub.unsubscribe(cls._channel(user_id))
+            except RedisError as e:
+                cls.errors += 1
+                logger.warning(f"Task event unsubscribe failed for user {user_id}: {e}")
+
+    @classmethod
+    async def _read(cls) -> None:
+        """Читать сообщения pub/sub и раздавать их подписчикам; при ошибке Redis переподключаться"""
+        delay = 0.5
+        while cls._subscribers:
+            try:
+                message = await cls._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                delay = 0.5
+            except RedisError as e:
+                cls.errors += 1
+                logger.warning(f"Task event stream interrupted, reconnecting in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            user_id = int(message["channel"].rsplit(":", 1)[1])
+            # Кадр собирается один раз и разделяется всеми соединениями пользователя
+            frame = sse_frame(json.loads(message["data"]).get("type", "message"), message["data"])
+            for subscriber in cls._subscribers.get(user_id, ()):
+                if subscriber.push(frame):
+                    cls.delivered += 1
+                else:
+                    cls.dropped += 1
+
+    @classmethod
+    async def stream(cls, user_id: int) -> AsyncIterator[str]:
+        """
+        Генератор Server-Sent Events для соединения пользователя.
+
+        Подписка выполняется внутри генератора, чтобы её снятие в `finally` было гарантировано.
+        При отсутствии событий раз в `TASK_EVENTS_PING_INTERVAL` секунд отправляется комментарий,
+        чтобы прокси не закрывали соединение, а разорванные соединения обнаруживались.
+        Если Redis недоступен, поток завершается и клиент переподключается через `retry` миллисекунд.
+        """
+        yield "retry: 5000\n\n"
+        try:
+            subscriber = await cls.subscribe(user_id)
+        except RedisError as e:
+            cls.errors += 1
+            logger.warning(f"Task event subscription failed for user {user_id}: {e}")
+            return
+
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), config.TASK_EVENTS_PING_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            cls.unsubscribe(subscriber)
+
+    @classmethod
+    def drain(cls) -> None:
+        """
+        Завершить все потоки событий процесса и перестать принимать новые.
+
+        Вызывается в начале плавной остановки: иначе бесконечные SSE-ответы держали бы процесс до истечения
+        таймаута. Клиенты переподключаются через `retry` к другим процессам и догоняют пропущенное
+        через `GET /tasks/changes`.
+        """
+        cls.draining = True
+        for subscribers in cls._subscribers.values():
+            for subscriber in subscribers:
+                subscriber.close()
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "connections": cls.connections,
+            "channels": len(cls._subscribers),
+            "published": cls.published,
+            "delivered": cls.delivered,
+            "dropped": cls.dropped,
+            "errors": cls.errors,
+        }
+
+    @classmethod
+    async def close(cls) -> None:
+        """Остановить чтение и закрыть pub/sub-соединение (вызывается при завершении приложения)"""
+        if cls._reader is not None:
+            cls._reader.cancel()
+            try:
+                await cls._reader
+            except (asyncio.CancelledError, RedisError):
+                pass
+            cls._reader = None
+        if cls._pubsub is not None:
+            await cls._pubsub.aclose()
+            cls._pubsub = None
+        cls._subscribers.clear()
+        cls.connections = 0
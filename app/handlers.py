@@ -1,21 +1,30 @@
 import sys
-from typing import List, Optional
+from typing import Iterable, List, Literal, Optional
 
 from fastapi.params import Body
+from fastapi.responses import StreamingResponse
 from loguru import logger
-from redis import Redis
+from redis.exceptions import RedisError
 
-from database import redis
-from database.db import AsyncSession, get_db
-from fastapi import APIRouter, Depends, HTTPException, status
+from database.db import AsyncSession, async_sessionmaker, get_db, get_read_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta, datetime
-from app.pydantic_models import User, TaskOut, TaskCreate, TaskUpdate, TaskBase
-
-from app.auth import AuthService, oauth2_scheme
+from app.pydantic_models import (Principal, User, TaskOut, TaskCreate, TaskUpdate, TaskBase, TaskBatchUpdate,
+                                 TaskBatchDelete, TaskBatchResult, TaskChanges, TaskImportResult, TaskSearchResult,
+                                 TaskStats)
+
+from app.auth import AuthService
+from app.events import TaskEventBroker
+from app.serialization import dump_task, dump_tasks
+from app.task_io import IMPORT_MEDIA_TYPES, export_csv, import_records, read_csv, read_ndjson
+from app.principal import get_current_principal
+from app.rate_limit import limit_by_ip, limit_by_username
 from config import config
 from database.mod import UserInDB, Task
-from database.redis import get_redis
+from database.refresh_tokens import RefreshTokenStore, RotationResult
+from database.routing import ReadRouting, get_user_by_username
+from database.task_cache import TaskListCache
 
 logger.remove()
 logger.add(sys.stdout, level="INFO", format="{time} {level} {message}", backtrace=True, diagnose=True)
@@ -24,7 +33,9 @@ logger.add(sys.stdout, level="INFO", format="{time} {level} {message}", backtrac
 router = APIRouter()
 
 
-@router.post("/auth/register")
+
+@router.post("/auth/register",
+             dependencies=[Depends(limit_by_ip("register", config.RATE_LIMIT_REGISTER_PER_IP))])
 async def register_user(user: User, db: AsyncSession = Depends(get_db)):
     """
     Регистрация нового пользователя.
@@ -42,30 +53,38 @@ async def register_user(user: User, db: AsyncSession = Depends(get_db)):
 
     **Ошибки**:
     - 400: Если пользователь с указанным именем уже зарегистрирован.
+    - 429: Если превышен лимит регистраций с одного IP-адреса (`RATE_LIMIT_REGISTER_PER_IP`).
     """
 
     db_user = await UserInDB.get_user_by_username(db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="User already registered")
 
-    hashed_password = AuthService.get_password_hash(user.password)
+    hashed_password = await AuthService.get_password_hash_async(user.password)
     new_user = await UserInDB.add(db, username=user.username, hashed_password=hashed_password)
 
-    access_token = AuthService.create_access_token(data={"sub": user.username})
+    access_token = AuthService.create_access_token(data={"sub": user.username, "uid": new_user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-@router.post("/auth/login")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+@router.post("/auth/login", dependencies=[
+    Depends(limit_by_ip("login", config.RATE_LIMIT_LOGIN_PER_IP)),
+    Depends(limit_by_username("login", config.RATE_LIMIT_LOGIN_PER_USERNAME)),
+])
+async def login(form_data: OAuth2PasswordRequestForm = Depends(),
+                db: AsyncSession = Depends(get_db),
+                read_db: AsyncSession = Depends(get_read_db)):
     """
     Авторизация пользователя и получение токена доступа.
 
     Этот эндпоинт позволяет пользователю пройти авторизацию с использованием имени пользователя и пароля.
-    В случае успешной авторизации возвращаются access_token и refresh_token.
+    В случае успешной авторизации возвращаются access_token и refresh_token. Каждый вход открывает отдельное
+    семейство refresh-токенов, поэтому устройства пользователя обновляют токены независимо.
 
     **Параметры**:
     - `form_data` (OAuth2PasswordRequestForm): Данные пользователя для авторизации (имя пользователя и пароль).
     - `db` (AsyncSession): Асинхронная сессия базы данных.
+    - `read_db` (AsyncSession): Сессия для чтения (реплика, если настроена).
 
     **Возвращает**:
     - `access_token` (str): Токен доступа для авторизованного пользователя.
@@ -74,33 +93,57 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
 
     **Ошибки**:
     - 401: Если имя пользователя или пароль некорректны.
+    - 429: Если превышен лимит попыток входа с одного IP-адреса или под одним именем пользователя.
+    - 503: Если хранилище refresh-токенов недоступно.
     """
 
-    user = await UserInDB.get_user_by_username(db, form_data.username)
+    user = await get_user_by_username(read_db, form_data.username)
+
+    verified, new_hash = (False, None)
+    if user:
+        if config.PASSWORD_REHASH_ON_LOGIN:
+            verified, new_hash = await AuthService.verify_and_update_password_async(form_data.password,
+                                                                                    user.hashed_password)
+        else:
+            verified = await AuthService.verify_password_async(form_data.password, user.hashed_password)
 
-    if not user or not AuthService.verify_password(form_data.password, user.hashed_password):
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if new_hash:
+        await UserInDB.update(db, user.id, hashed_password=new_hash)
+
     access_token_expires = timedelta(minutes=30)
-    access_token = AuthService.create_access_token(data={"sub":  form_data.username}, expires_delta=access_token_expires)
+    access_token = AuthService.create_access_token(data={"sub": form_data.username, "uid": user.id},
+                                                expires_delta=access_token_expires)
     refresh_token_expires = timedelta(days=7)
-    refresh_token = AuthService.create_refresh_token(data={"sub":  form_data.username}, expires_delta=refresh_token_expires)
+    token_id = RefreshTokenStore.new_id()
+    try:
+        family_id = await RefreshTokenStore.create_family(user.id, token_id, refresh_token_expires)
+    except RedisError as e:
+        logger.error(f"Refresh token store unavailable: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Try again later")
+    refresh_token = AuthService.create_refresh_token(
+        data={"sub": form_data.username, "uid": user.id, "fid": family_id, "jti": token_id},
+        expires_delta=refresh_token_expires,
+    )
 
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 @router.post("/auth/refresh")
-async def refresh_access_token(refresh_token: str = Body(..., embed=True),
-                               db: AsyncSession = Depends(get_db),
-                               redis: Redis = Depends(get_redis)):
+async def refresh_access_token(refresh_token: str = Body(..., embed=True)):
     """
     Обновление токенов с использованием refresh токена.
 
     Этот эндпоинт позволяет пользователю обновить access_token с использованием refresh токена.
+    Refresh токен одноразовый: он проверяется по семейству в Redis и заменяется новым одной атомарной операцией,
+    обращения к базе данных нет. Повторное использование уже заменённого токена отзывает всё семейство
+    (вход на этом устройстве), после чего нужно авторизоваться заново.
 
     **Параметры**:
     - `refresh_token` (str): Токен обновления.
@@ -110,29 +153,41 @@ async def refresh_access_token(refresh_token: str = Body(..., embed=True),
     - `refresh_token` (str): Новый refresh токен.
 
     **Ошибки**:
-    - 401: Если refresh токен некорректен или просрочен.
+    - 401: Если refresh токен некорректен, просрочен, отозван, уже был использован
+      или вместо него передан access-токен.
+    - 503: Если хранилище refresh-токенов недоступно.
     """
 
     payload = AuthService.decode_refresh_token(refresh_token)
     if not payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token")
 
-    username = payload.get("sub")
-    if not username:
+    username, user_id = payload.get("sub"), payload.get("uid")
+    family_id, token_id = payload.get("fid"), payload.get("jti")
+    if not (username and user_id and family_id and token_id):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
-    user = await UserInDB.get_user_by_username(db, username)
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-
-    access_token_expires = timedelta(minutes=30)
-    access_token = AuthService.create_access_token(data={"sub": username}, expires_delta=access_token_expires)
-
     refresh_token_expires = timedelta(days=7)
-    new_refresh_token = AuthService.create_refresh_token(data={"sub": username}, expires_delta=refresh_token_expires)
+    new_token_id = RefreshTokenStore.new_id()
+    try:
+        result = await RefreshTokenStore.rotate(family_id, token_id, new_token_id, refresh_token_expires)
+    except RedisError as e:
+        logger.error(f"Refresh token store unavailable: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Try again later")
+
+    if result is RotationResult.REUSED:
+        logger.warning(f"Refresh token reuse detected for user {username}, token family {family_id} revoked")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token has been revoked")
+    if result is RotationResult.UNKNOWN:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token has been revoked")
 
-
-    await redis.setex(f"refresh_token:{username}", refresh_token_expires.total_seconds(), new_refresh_token)
+    access_token_expires = timedelta(minutes=30)
+    access_token = AuthService.create_access_token(data={"sub": username, "uid": user_id},
+                                                   expires_delta=access_token_expires)
+    new_refresh_token = AuthService.create_refresh_token(
+        data={"sub": username, "uid": user_id, "fid": family_id, "jti": new_token_id},
+        expires_delta=refresh_token_expires,
+    )
 
     return {
         "access_token": access_token,
@@ -144,7 +199,7 @@ async def refresh_access_token(refresh_token: str = Body(..., embed=True),
 @router.post("/tasks", response_model=TaskOut, status_code=status.HTTP_201_CREATED)
 async def create_task(task: TaskBase,
                       session: AsyncSession = Depends(get_db),
-                      token: str = Depends(oauth2_scheme)):
+                      principal: Principal = Depends(get_current_principal)):
     """
         Создание новой задачи.
 
@@ -154,68 +209,486 @@ async def create_task(task: TaskBase,
         **Параметры**:
         - `task` (TaskBase): Объект с данными задачи, такими как название, описание и статус.
         - `session` (AsyncSession): Асинхронная сессия базы данных.
-        - `token` (str): Токен пользователя для авторизации.
+        - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
 
         **Возвращает**:
         - `TaskOut`: Объект задачи с данными, такими как идентификатор, название, описание, статус.
 
         **Ошибки**:
-        - 400: Если авторизация не удалась или произошла ошибка при создании задачи.
+        - 401: Если авторизация не удалась.
         """
 
-    username = await AuthService.get_current_user(token)
-    if not (user := await UserInDB.get_user_by_username(session, username)):
-        return "ошибка пользователя, попробуйте авторизоваться и повторить запрос"
-
     # Создаем новую задачу
     new_task = await Task.add(
         session,
         title=task.title,
         description=task.description,
         status=task.status,
-        user_id=user.id
+        user_id=principal.id
     )
+    await _tasks_changed(principal.id, "created", tasks=[new_task])
     return new_task
 
 
 @router.get("/tasks", response_model=List[TaskOut])
 async def get_tasks(
     status: Optional[bool] = None,
-    session: AsyncSession = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
+    limit: int = Query(config.TASKS_PAGE_DEFAULT_LIMIT, ge=1, le=config.TASKS_PAGE_MAX_LIMIT),
+    after: Optional[int] = Query(None, ge=0),
+    stream: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    principal: Principal = Depends(get_current_principal),
 ):
     """
         Получение списка задач.
 
         Этот эндпоинт позволяет пользователю получить список своих задач. Можно фильтровать задачи по статусу (выполнена/невыполнена).
+        Задачи упорядочены по id. Для постраничной выборки используется курсор: в `after` передаётся id последней
+        задачи предыдущей страницы, значение для следующего запроса возвращается в заголовке `X-Next-Cursor`.
+        Чтение идёт с реплики, если они настроены, кроме короткого окна после записи пользователя.
 
         **Параметры**:
         - `status` (Optional[bool]): Фильтр по статусу задачи (True/False).
-        - `session` (AsyncSession): Асинхронная сессия базы данных.
-        - `token` (str): Токен пользователя для авторизации.
+        - `limit` (int): Размер страницы, по умолчанию `TASKS_PAGE_DEFAULT_LIMIT`. Все задачи одним ответом
+          отдаются только потоком (`stream`).
+        - `after` (Optional[int]): Курсор - id задачи, после которой начинать выдачу.
+        - `stream` (bool): Отдать задачи потоком в формате NDJSON (`application/x-ndjson`), по одной задаче на строку.
+        - `if_none_match` (Optional[str]): ETag из предыдущего ответа для условного запроса.
+        - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
+
+        **Возвращает**:
+        - Список задач в виде объектов TaskOut. Ответ содержит заголовок `ETag`, который меняется при любом
+          изменении задач пользователя.
+        - 304 Not Modified без тела, если переданный `If-None-Match` совпадает с текущим ETag. В этом случае
+          выполняется только чтение версии из Redis, без запроса к базе.
+
+        **Ошибки**:
+        - 401: Если авторизация не удалась.
+        """
+
+    if stream:
+        session_factory = await ReadRouting.sessionmaker_for(principal.id)
+        return StreamingResponse(
+            _stream_tasks_ndjson(session_factory, principal.id, status, after),
+            media_type="application/x-ndjson",
+        )
+
+    version = etag = None
+    params = (status, limit, after)
+    if config.TASK_LIST_CACHE_ENABLED or config.TASK_LIST_ETAG_ENABLED:
+        version = await TaskListCache.get_version(principal.id)
+    headers = {}
+    if version and config.TASK_LIST_ETAG_ENABLED:
+        etag = _task_list_etag(version, params)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if if_none_match and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+    if version and config.TASK_LIST_CACHE_ENABLED:
+        if cached := await TaskListCache.get(principal.id, version, params):
+            body, cursor = cached
+            if cursor:
+                headers["X-Next-Cursor"] = cursor
+            return Response(content=body, media_type="application/json", headers=headers)
+
+    session_factory = await ReadRouting.sessionmaker_for(principal.id)
+    async with session_factory() as session:
+        tasks = await Task.get_tasks(session, user_id=principal.id, status=status, limit=limit, after=after)
+    cursor = str(tasks[-1]["id"]) if len(tasks) == limit else None
+    body = dump_tasks(tasks).decode()
+    if version and config.TASK_LIST_CACHE_ENABLED:
+        await TaskListCache.set(principal.id, version, params, body, cursor)
+    if cursor:
+        headers["X-Next-Cursor"] = cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _task_list_etag(version: str, params: tuple) -> str:
+    """ETag списка задач: версия задач пользователя и параметры выборки"""
+    return '"' + "-".join([version] + ["" if p is None else str(p) for p in params]) + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Слабое сравнение ETag для `If-None-Match` (RFC 9110, 13.1.2)"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+async def _stream_tasks_ndjson(session_factory: async_sessionmaker[AsyncSession], user_id: int,
+                               status: Optional[bool], after: Optional[int]):
+    """
+    Генератор NDJSON-потока задач пользователя.
+
+    Сессия открывается внутри генератора: зависимость `get_db` закрывается до начала отправки тела ответа.
+    """
+
+    async with session_factory() as session:
+        async for row in Task.stream_tasks(session, user_id=user_id, status=status, after=after,
+                                           batch_size=config.TASKS_STREAM_BATCH_SIZE):
+            yield dump_task(row) + b"\n"
+
+
+@router.get("/tasks/search", response_model=List[TaskSearchResult])
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, ge=1, le=config.TASKS_PAGE_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    principal: Principal = Depends(get_current_principal),
+):
+    """
+        Полнотекстовый поиск задач.
+
+        Ищет по названию и описанию задач пользователя. Поиск выполняется в базе данных по полнотекстовому индексу,
+        результаты упорядочены по релевантности, найденные слова выделены тегами `<mark>`.
+
+        **Параметры**:
+        - `q` (str): Поисковый запрос. Слова через пробел должны встречаться все, `"фраза в кавычках"` - подряд,
+          слово с `*` на конце (`mil*`) ищется как префикс, `-слово` исключает задачи с ним, `or` разделяет
+          альтернативы (`milk -buy or bread`). Синтаксис одинаков на PostgreSQL и SQLite. Если в запросе нет
+          слов с буквами или цифрами или в нём только исключения, возвращается пустой список.
+        - `limit` (int): Размер страницы.
+        - `offset` (int): Смещение от начала выдачи.
+        - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
+
+        **Возвращает**:
+        - Список задач в виде объектов TaskSearchResult с релевантностью и подсветкой совпадений.
+
+        **Ошибки**:
+        - 401: Если авторизация не удалась.
+        """
+
+    session_factory = await ReadRouting.sessionmaker_for(principal.id)
+    async with session_factory() as session:
+        return await Task.search(session, user_id=principal.id, query=q, limit=limit, offset=offset)
+
+
+@router.get("/tasks/changes", response_model=TaskChanges)
+async def get_task_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(config.TASKS_PAGE_MAX_LIMIT, ge=1, le=config.TASKS_PAGE_MAX_LIMIT),
+    principal: Principal = Depends(get_current_principal),
+):
+    """
+        Получение изменений задач для инкрементальной синхронизации.
+
+        Каждое изменение задач пользователя получает следующую ревизию. Эндпоинт возвращает задачи, созданные
+        или изменённые после ревизии `since`, и идентификаторы удалённых задач. Первая синхронизация выполняется
+        с `since=0`, следующие - с ревизией из предыдущего ответа. Пока `has_more` равен true, нужно запрашивать
+        следующую страницу.
+
+        **Параметры**:
+        - `since` (int): Последняя ревизия, известная клиенту.
+        - `limit` (int): Максимальное количество изменений в ответе.
+        - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
+
+        **Возвращает**:
+        - TaskChanges: новая ревизия, признак `has_more`, изменённые задачи (`upserts`) и id удалённых (`deleted`).
+
+        **Ошибки**:
+        - 401: Если авторизация не удалась.
+        """
+
+    session_factory = await ReadRouting.sessionmaker_for(principal.id)
+    async with session_factory() as session:
+        rows, has_more = await Task.get_changes(session, user_id=principal.id, since=since, limit=limit)
+    return TaskChanges(
+        revision=rows[-1]["revision"] if rows else since,
+        has_more=has_more,
+        upserts=[dict(row) for row in rows if row["deleted_at"] is None],
+        deleted=[row["id"] for row in rows if row["deleted_at"] is not None],
+    )
+
+
+@router.get("/tasks/stats", response_model=TaskStats)
+async def get_task_stats(principal: Principal = Depends(get_current_principal)):
+    """
+        Статистика задач пользователя.
+
+        Счётчики хранятся в строке пользователя и меняются в транзакции каждой записи задач, поэтому ответ
+        требует одного чтения по первичному ключу, без подсчёта задач.
+
+        **Параметры**:
+        - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
+
+        **Возвращает**:
+        - TaskStats: общее число задач (`total`), выполненных (`completed`) и невыполненных (`open`).
+
+        **Ошибки**:
+        - 401: Если авторизация не удалась.
+        - 404: Если пользователь не найден.
+        """
+
+    session_factory = await ReadRouting.sessionmaker_for(principal.id)
+    async with session_factory() as session:
+        counts = await UserInDB.get_task_counts(session, principal.id)
+    if counts is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    total, completed = counts["task_count"], counts["task_completed_count"]
+    return TaskStats(total=total, completed=completed, open=total - completed)
+
+
+@router.get("/tasks/events", response_class=StreamingResponse)
+async def task_events(principal: Principal = Depends(get_current_principal)):
+    """
+        Поток событий изменения задач (Server-Sent Events).
+
+        Соединение остаётся открытым, сервер отправляет события `created`, `updated` (с задачами в поле `tasks`)
+        и `deleted` (с идентификаторами в поле `ids`) при изменении задач пользователя с любого устройства.
+        Во время импорта после каждой загруженной порции приходит событие `imported` с числом уже загруженных
+        задач в поле `imported`; сами задачи клиент получает через `GET /tasks/changes`.
+        Событие `resync` означает, что клиент не успевал получать события и часть из них пропущена:
+        нужно догнать состояние через `GET /tasks/changes`.
+
+        **Параметры**:
+        - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
+
+        **Возвращает**:
+        - Поток `text/event-stream`.
+
+        **Ошибки**:
+        - 401: Если авторизация не удалась.
+        - 404: Если push-уведомления отключены.
+        - 503: Если превышен лимит соединений процесса.
+        """
+
+    if not config.TASK_EVENTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    TaskEventBroker.check_capacity()
+    return StreamingResponse(
+        TaskEventBroker.stream(principal.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/tasks/export", response_class=StreamingResponse)
+async def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    status: Optional[bool] = None,
+    principal: Principal = Depends(get_current_principal),
+):
+    """
+        Выгрузка всех задач пользователя файлом.
+
+        Задачи читаются из серверного курсора порциями по `TASKS_STREAM_BATCH_SIZE` и сразу отправляются клиенту,
+        поэтому память сервера не зависит от числа задач.
+
+        **Параметры**:
+        - `format` (str): `ndjson` - по одному JSON-объекту TaskOut на строку, `csv` - таблица с колонками
+          `id`, `title`, `description`, `status`.
+        - `status` (Optional[bool]): Фильтр по статусу задачи (True/False).
+        - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
 
         **Возвращает**:
-        - Список задач в виде объектов TaskOut.
+        - Поток `application/x-ndjson` или `text/csv` с заголовком `Content-Disposition: attachment`.
 
         **Ошибки**:
-        - 400: Если возникла ошибка при авторизации пользователя.
+        - 401: Если авторизация не удалась.
         """
 
-    username = await AuthService.get_current_user(token)
-    if not (user := await UserInDB.get_user_by_username(session, username)):
-        return "ошибка пользователя, попробуйте авторизоваться и повторить запрос"
+    session_factory = await ReadRouting.sessionmaker_for(principal.id)
+    headers = {"Content-Disposition": f'attachment; filename="tasks.{format}"'}
+    if format == "csv":
+        return StreamingResponse(_stream_tasks_csv(session_factory, principal.id, status),
+                                 media_type="text/csv; charset=utf-8", headers=headers)
+    return StreamingResponse(_stream_tasks_ndjson(session_factory, principal.id, status, None),
+                             media_type="application/x-ndjson", headers=headers)
+
+
+async def _stream_tasks_csv(session_factory: async_sessionmaker[AsyncSession], user_id: int,
+                            status: Optional[bool]):
+    """Генератор CSV-потока задач пользователя (сессия открывается внутри, как в `_stream_tasks_ndjson`)"""
+
+    async with session_factory() as session:
+        rows = Task.stream_tasks(session, user_id=user_id, status=status,
+                                 batch_size=config.TASKS_STREAM_BATCH_SIZE)
+        async for chunk in export_csv(rows):
+            yield chunk
+
+
+@router.post("/tasks/import", response_model=TaskImportResult, openapi_extra={
+    "requestBody": {
+        "required": True,
+        "content": {media_type: {"schema": {"type": "string", "format": "binary"}}
+                    for media_type in IMPORT_MEDIA_TYPES},
+    },
+})
+async def import_tasks(
+        request: Request,
+        session: AsyncSession = Depends(get_db),
+        principal: Principal = Depends(get_current_principal),
+):
+    """
+    Загрузка задач из файла.
+
+    Тело запроса читается потоком и разбирается по мере поступления. Задачи загружаются порциями по
+    `TASKS_IMPORT_CHUNK_SIZE` (на PostgreSQL через `COPY`), каждая порция фиксируется отдельной транзакцией.
+    После каждой порции подписчикам `GET /tasks/events` отправляется событие `imported` с числом загруженных задач.
+    Если импорт прервался, уже загруженные порции остаются сохранёнными.
+
+    **Параметры**:
+    - Тело `application/x-ndjson` (по одному JSON-объекту TaskBase на строку) или `text/csv` с заголовком,
+      содержащим колонку `title` и, при необходимости, `description` и `status`.
+    - `session` (AsyncSession): Асинхронная сессия базы данных.
+    - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
+
+    **Возвращает**:
+    - Число загруженных и пропущенных записей, число порций и первые `TASKS_IMPORT_MAX_ERRORS` ошибок
+      с номерами строк. Некорректные записи пропускаются и не прерывают импорт.
+
+    **Ошибки**:
+    - 401: Если авторизация не удалась.
+    - 413: Если запись длиннее `TASKS_IMPORT_MAX_LINE_BYTES`.
+    - 415: Если тип тела не поддерживается.
+    - 422: Если в CSV нет колонки `title`.
+    """
+
+    media_type = request.headers.get("content-type", "").partition(";")[0].strip().lower()
+    if media_type not in IMPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail=f"Expected one of: {', '.join(IMPORT_MEDIA_TYPES)}")
+    read_records = read_csv if IMPORT_MEDIA_TYPES[media_type] == "csv" else read_ndjson
+    imported = 0
+
+    async def load_chunk(rows: list[dict]) -> int:
+        nonlocal imported
+        count = await Task.load_many(session, principal.id, rows)
+        imported += count
+        logger.info(f"Import for user {principal.id}: {imported} tasks loaded")
+        await _tasks_changed(principal.id, "imported", imported=imported)
+        return count
+
+    return await import_records(read_records(request.stream()), load_chunk)
+
+
+@router.post("/tasks/batch", response_model=List[TaskOut], status_code=status.HTTP_201_CREATED)
+async def create_tasks_batch(
+        tasks: List[TaskBase] = Body(..., min_length=1, max_length=config.TASKS_BATCH_MAX_SIZE),
+        session: AsyncSession = Depends(get_db),
+        principal: Principal = Depends(get_current_principal),
+):
+    """
+    Пакетное создание задач.
+
+    Все задачи вставляются одним многострочным `INSERT ... RETURNING` в одной транзакции.
+
+    **Параметры**:
+    - `tasks` (List[TaskBase]): Список задач, не больше `TASKS_BATCH_MAX_SIZE`.
+    - `session` (AsyncSession): Асинхронная сессия базы данных.
+    - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
+
+    **Возвращает**:
+    - Список созданных задач в порядке запроса.
+
+    **Ошибки**:
+    - 401: Если авторизация не удалась.
+    - 422: Если список пуст, слишком велик или содержит некорректные задачи.
+    """
+
+    rows = [dict(task.model_dump(), user_id=principal.id) for task in tasks]
+    created = await Task.add_many(session, rows)
+    await _tasks_changed(principal.id, "created", tasks=created)
+    return created
+
+
+@router.patch("/tasks/batch", response_model=List[TaskBatchResult])
+async def update_tasks_batch(
+        tasks: List[TaskBatchUpdate] = Body(..., min_length=1, max_length=config.TASKS_BATCH_MAX_SIZE),
+        session: AsyncSession = Depends(get_db),
+        principal: Principal = Depends(get_current_principal),
+):
+    """
+    Пакетное обновление задач.
+
+    Все изменения применяются одним `UPDATE ... FROM (VALUES ...) WHERE ... AND user_id = ... RETURNING`
+    с одной ревизией на пакет. Принадлежность задач проверяется в самом запросе.
+
+    **Параметры**:
+    - `tasks` (List[TaskBatchUpdate]): Список изменений с идентификаторами задач.
+    - `session` (AsyncSession): Асинхронная сессия базы данных.
+    - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
+
+    **Возвращает**:
+    - Результат по каждой задаче в порядке запроса: обновлённая задача или ошибка `not_found`,
+      если задачи нет или она принадлежит другому пользователю.
+
+    **Ошибки**:
+    - 400: Если идентификаторы задач повторяются.
+    - 401: Если авторизация не удалась.
+    """
+
+    ids = [task.id for task in tasks]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Идентификаторы задач не должны повторяться")
+
+    changes, unchanged_ids = [], []
+    for task in tasks:
+        values = task.model_dump(exclude={"id"}, exclude_none=True)
+        if values:
+            changes.append(dict(values, id=task.id))
+        else:
+            unchanged_ids.append(task.id)
+
+    changed = await Task.update_batch(session, changes, commit=False, user_id=principal.id) if changes else []
+    found = await Task.get_tasks_by_ids(session, unchanged_ids, user_id=principal.id) if unchanged_ids else []
+    updated = {task.id: task for task in [*changed, *found]}
+    await session.commit()
+    if changed:
+        await _tasks_changed(principal.id, "updated", tasks=changed)
+
+    return [
+        TaskBatchResult(id=task_id, ok=True, task=updated[task_id]) if task_id in updated
+        else TaskBatchResult(id=task_id, ok=False, error="not_found")
+        for task_id in ids
+    ]
+
+
+@router.delete("/tasks/batch", response_model=List[TaskBatchResult])
+async def delete_tasks_batch(
+        batch: TaskBatchDelete,
+        session: AsyncSession = Depends(get_db),
+        principal: Principal = Depends(get_current_principal),
+):
+    """
+    Пакетное удаление задач.
+
+    Задачи помечаются удалёнными одним `UPDATE ... WHERE id IN (...) AND user_id = ... RETURNING`
+    и остаются tombstone-записями для `GET /tasks/changes`.
+
+    **Параметры**:
+    - `batch` (TaskBatchDelete): Идентификаторы задач для удаления.
+    - `session` (AsyncSession): Асинхронная сессия базы данных.
+    - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
+
+    **Возвращает**:
+    - Результат по каждой задаче: `ok` или ошибка `not_found`, если задачи нет или она принадлежит
+      другому пользователю.
+
+    **Ошибки**:
+    - 401: Если авторизация не удалась.
+    - 422: Если список слишком велик.
+    """
 
-    tasks = await Task.get_tasks(session, user_id=user.id, status=status)
-    return tasks
+    if len(batch.ids) > config.TASKS_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=422, detail=f"Не больше {config.TASKS_BATCH_MAX_SIZE} задач за запрос")
 
+    deleted = set(await Task.delete_many(session, batch.ids, user_id=principal.id))
+    if deleted:
+        await _tasks_changed(principal.id, "deleted", ids=deleted)
+    return [
+        TaskBatchResult(id=task_id, ok=True) if task_id in deleted
+        else TaskBatchResult(id=task_id, ok=False, error="not_found")
+        for task_id in dict.fromkeys(batch.ids)
+    ]
 
 
 @router.put("/tasks/{task_id}", response_model=TaskOut)
 async def update_task(
         task_id: int,
         task: TaskUpdate,
-        token: str = Depends(oauth2_scheme),
-        session: AsyncSession = Depends(get_db)
+        session: AsyncSession = Depends(get_db),
+        principal: Principal = Depends(get_current_principal),
 ):
     """
     Обновление задачи.
@@ -225,44 +698,33 @@ async def update_task(
     **Параметры**:
     - `task_id` (int): Идентификатор задачи, которую нужно обновить.
     - `task` (TaskUpdate): Обновлённые данные задачи.
-    - `token` (str): Токен пользователя для авторизации.
+    - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
     - `session` (AsyncSession): Асинхронная сессия базы данных.
 
     **Возвращает**:
-    - Обновлённую задачу в виде объекта TaskOut.
+    - Обновлённую задачу в виде объекта TaskOut. Если в теле нет изменений, возвращается текущая задача.
 
     **Ошибки**:
     - 404: Если задача с таким ID не найдена.
-    - 400: Если возникла ошибка при обновлении задачи.
+    - 403: Если задача не принадлежит текущему пользователю.
     """
 
-    username = await AuthService.get_current_user(token)
-    if not (user := await UserInDB.get_user_by_username(session, username)):
-        raise HTTPException(status_code=400, detail="Ошибка пользователя, попробуйте авторизоваться и повторить запрос")
-
-    task_to_update = await Task.get_task_by_id(session, task_id)
-
-    if task_to_update.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Вы не можете редактировать эту задачу")
-
-    updated_fields = {}
-    if task.title is not None:
-        updated_fields["title"] = task.title
-    if task.description is not None:
-        updated_fields["description"] = task.description
-    if task.status is not None:
-        updated_fields["status"] = task.status
-
-    updated_task = await Task.update(session, task_id, **updated_fields)
+    updated_fields = task.model_dump(exclude_none=True)
+    updated_task = await Task.update_returning(session, task_id, updated_fields, user_id=principal.id)
+    if updated_task is None:
+        await _raise_task_access_error(session, task_id, "Вы не можете редактировать эту задачу")
 
+    # Пустое тело возвращает задачу без изменений: ревизия, версия кэша и события не меняются
+    if updated_fields:
+        await _tasks_changed(principal.id, "updated", tasks=[updated_task])
     return updated_task
 
 
 @router.delete("/tasks/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(
         task_id: int,
-        token: str = Depends(oauth2_scheme),
-        session: AsyncSession = Depends(get_db)
+        session: AsyncSession = Depends(get_db),
+        principal: Principal = Depends(get_current_principal),
 ):
     """
         Удаление задачи.
@@ -271,7 +733,7 @@ async def delete_task(
 
         **Параметры**:
         - `task_id` (int): Идентификатор задачи, которую нужно удалить.
-        - `token` (str): Токен пользователя для авторизации.
+        - `principal` (Principal): Текущий пользователь, полученный из токена доступа.
         - `session` (AsyncSession): Асинхронная сессия базы данных.
 
         **Возвращает**:
@@ -279,21 +741,45 @@ async def delete_task(
 
         **Ошибки**:
         - 404: Если задача с таким ID не найдена.
-        - 400: Если возникла ошибка при удалении задачи.
         - 403: Если задача не принадлежит текущему пользователю.
         """
 
-    username = await AuthService.get_current_user(token)
-    if not (user := await UserInDB.get_user_by_username(session, username)):
-        raise HTTPException(status_code=400, detail="Ошибка пользователя, попробуйте авторизоваться и повторить запрос")
+    if await Task.delete_returning(session, task_id, user_id=principal.id) is None:
+        await _raise_task_access_error(session, task_id, "Вы не можете удалить эту задачу")
 
-    task_to_delete = await Task.get_task_by_id(session, task_id)
+    await _tasks_changed(principal.id, "deleted", ids=[task_id])
+    return {"message": "Задача успешно удалена"}
 
-    if not task_to_delete or task_to_delete.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Вы не можете удалить эту задачу")
 
-    task_deleted = await Task.delete(session, task_id)
-    if not task_deleted:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
+async def _tasks_changed(user_id: int, event_type: str, tasks: Iterable[Task] = (), ids: Iterable[int] = (),
+                         **details):
+    """
+    Отметить изменение задач пользователя после фиксации транзакции и разослать событие `event_type`.
 
-    return {"message": "Задача успешно удалена"}
+    Событие `deleted` содержит идентификаторы `ids`, `created` и `updated` - задачи `tasks`,
+    остальные события - только поля `details`.
+    """
+
+    if config.TASK_LIST_CACHE_ENABLED or config.TASK_LIST_ETAG_ENABLED:
+        await TaskListCache.bump_version(user_id)
+    await ReadRouting.mark_written(user_id)
+    if config.TASK_EVENTS_ENABLED:
+        event = {"type": event_type, **details}
+        if event_type == "deleted":
+            event["ids"] = sorted(ids)
+        elif event_type in ("created", "updated"):
+            event["tasks"] = [TaskOut.model_validate(task).model_dump() for task in tasks]
+        await TaskEventBroker.publish(user_id, event)
+
+
+async def _raise_task_access_error(session: AsyncSession, task_id: int, forbidden_detail: str):
+    """
+    Выбросить 404 или 403 для задачи, которую не удалось изменить.
+
+    Вызывается только после того, как запрос с условием на владельца не затронул ни одной строки,
+    поэтому дополнительный запрос выполняется лишь на пути ошибки.
+    """
+
+    if await Task.get_task_by_id(session, task_id) is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    raise HTTPException(status_code=403, detail=forbidden_detail)
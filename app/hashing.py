@@ -0,0 +1,129 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette import status
+
+from app.metrics import observe_auth
+from config import config
+
+T = TypeVar("T")
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=config.BCRYPT_ROUNDS)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Проверить пароль и, если хеш устарел (например, сменился work factor), вернуть новый хеш"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def load_backend() -> str:
+    """Загрузить backend bcrypt: passlib делает это при первом хешировании, включая самопроверку библиотеки"""
+    return pwd_context.handler("bcrypt").get_backend()
+
+
+class PasswordHasher:
+    """
+    Выполнение bcrypt в пуле потоков или процессов, чтобы не блокировать event loop.
+
+    Одновременно в пул отправляется не больше `PASSWORD_HASH_MAX_CONCURRENCY` задач, остальные ждут
+    в очереди. Если очередь длиннее `PASSWORD_HASH_MAX_QUEUE` (0 - без ограничения), запрос отклоняется с 503.
+    """
+
+    _executor: Optional[Executor] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    in_flight = 0
+    waiting = 0
+    max_waiting = 0
+    completed = 0
+    rejected = 0
+
+    @classmethod
+    def _get_executor(cls) -> Executor:
+        if cls._executor is None:
+            if config.PASSWORD_HASH_EXECUTOR == "process":
+                cls._executor = ProcessPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS)
+            else:
+                cls._executor = ThreadPoolExecutor(max_workers=config.PASSWORD_HASH_WORKERS,
+                                                   thread_name_prefix="bcrypt")
+        return cls._executor
+
+    @classmethod
+    def _get_semaphore(cls) -> asyncio.Semaphore:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(config.PASSWORD_HASH_MAX_CONCURRENCY)
+        return cls._semaphore
+
+    @classmethod
+    async def run(cls, func: Callable[..., T], *args) -> T:
+        """Выполнить функцию хеширования в пуле с учётом лимита конкурентности"""
+        if config.PASSWORD_HASH_MAX_QUEUE and cls.waiting >= config.PASSWORD_HASH_MAX_QUEUE:
+            cls.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, try again later",
+                headers={"Retry-After": "1"},
+            )
+
+        started = time.perf_counter()
+        cls.waiting += 1
+        cls.max_waiting = max(cls.max_waiting, cls.waiting)
+        try:
+            await cls._get_semaphore().acquire()
+        finally:
+            cls.waiting -= 1
+
+        cls.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(cls._get_executor(), func, *args)
+        finally:
+            cls.in_flight -= 1
+            cls.completed += 1
+            cls._semaphore.release()
+            observe_auth(f"bcrypt_{func.__name__}", time.perf_counter() - started)
+
+    @classmethod
+    async def warm_up(cls) -> None:
+        """
+        Запустить рабочие потоки или процессы пула и загрузить в них backend bcrypt.
+
+        Вызывается при старте приложения, чтобы первые входы не ждали создания пула и инициализации bcrypt.
+        """
+        loop = asyncio.get_running_loop()
+        executor = cls._get_executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, load_backend)
+                               for _ in range(config.PASSWORD_HASH_WORKERS)))
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Текущее состояние пула хеширования"""
+        return {
+            "executor": config.PASSWORD_HASH_EXECUTOR,
+            "workers": config.PASSWORD_HASH_WORKERS,
+            "in_flight": cls.in_flight,
+            "queue_depth": cls.waiting,
+            "max_queue_depth": cls.max_waiting,
+            "completed": cls.completed,
+            "rejected": cls.rejected,
+        }
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Остановить пул (вызывается при завершении приложения)"""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+        cls._semaphore = None
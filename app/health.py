@@ -0,0 +1,91 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.events import TaskEventBroker
+from config import config
+from database.db import engine, pool_stats, replica_engines
+from database.redis import ping_redis, redis_pool_stats
+
+
+class Readiness:
+    """Готовность процесса принимать запросы; при плавной остановке процесс переводится в режим drain"""
+
+    draining = False
+
+    @classmethod
+    def start_draining(cls) -> None:
+        cls.draining = True
+        TaskEventBroker.drain()
+
+
+async def _check_database(pool_engine: AsyncEngine) -> Optional[str]:
+    """Получить соединение из пула и выполнить `SELECT 1`; вернуть текст ошибки или None"""
+    try:
+        async with pool_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except (SQLAlchemyError, OSError) as e:
+        return str(e)
+    return None
+
+
+async def _check_redis() -> Optional[str]:
+    return None if await ping_redis() else "ping failed"
+
+
+async def _with_timeout(check) -> str:
+    try:
+        error = await asyncio.wait_for(check, config.READINESS_TIMEOUT)
+    except asyncio.TimeoutError:
+        return "timeout"
+    return error or "ok"
+
+
+health_router = APIRouter()
+
+
+@health_router.get("/health/live", include_in_schema=False)
+async def live():
+    """Процесс жив и обрабатывает запросы (liveness)"""
+    return {"status": "ok"}
+
+
+@health_router.get("/health/ready", include_in_schema=False)
+async def ready():
+    """
+    Готовность процесса принимать трафик (readiness).
+
+    Проверяется, что из каждого пула базы (основной и реплик) и из пула Redis за `READINESS_TIMEOUT`
+    удаётся получить соединение и выполнить запрос. Исчерпанный пул не отдаёт соединение вовремя,
+    поэтому перегруженный процесс тоже считается неготовым. В ответ включается состояние пулов.
+
+    **Возвращает**:
+    - 200, если все проверки прошли.
+    - 503, если хотя бы одна проверка не прошла или процесс завершается (drain).
+    """
+    if Readiness.draining:
+        return JSONResponse({"status": "draining"}, status_code=503)
+
+    engines = {"database": engine, **{f"replica{i}": replica for i, replica in enumerate(replica_engines)}}
+    names = [*engines, "redis"]
+    results = await asyncio.gather(*(_with_timeout(_check_database(pool_engine)) for pool_engine in engines.values()),
+                                   _with_timeout(_check_redis()))
+    checks = dict(zip(names, results))
+    ok = all(result == "ok" for result in results)
+    if not ok:
+        logger.warning(f"Readiness check failed: {checks}")
+
+    return JSONResponse({
+        "status": "ready" if ok else "unavailable",
+        "checks": checks,
+        "pools": {
+            **{name: pool_stats(pool_engine) for name, pool_engine in engines.items()},
+            "redis": redis_pool_stats(),
+        },
+    }, status_code=200 if ok else 503)
@@ -1,29 +1,80 @@
+import asyncio
+import time
 from contextlib import asynccontextmanager
+from typing import Awaitable
 
-import uvicorn
 from fastapi import FastAPI
 from fastapi.routing import APIRouter
 
 
+from app.auth import AuthService
+from app.events import TaskEventBroker
 from app.handlers import router, logger
+from app.hashing import PasswordHasher
+from app.health import health_router
+from app.metrics import (
+    GaugeCollector, MetricsMiddleware, flush_snapshots, instrument_engine, metrics_router, write_snapshot,
+)
+from app.principal import PrincipalResolver, user_not_found_handler
+from app.rate_limit import RateLimiter
+from config import config
 
-from database.db import init_db
-from database.redis import init_redis, close_redis
+from database.db import dispose_engines, engine, init_db, pool_stats, replica_engines, warm_up_pools
+from database.mod import UserNotFoundError
+from database.redis import init_redis, close_redis, redis_pool_stats
+from database.task_cache import TaskListCache
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-
-    await init_db()
-    await init_redis()
-
-    logger.info("Приложение успешно запущено")
+    """
+    Запуск и остановка приложения.
+
+    Проверка схемы выполняется первой: при несовпадении миграций процесс не должен принимать запросы.
+    Прогрев пулов базы и Redis и пула bcrypt независимы и выполняются параллельно. Длительность каждого
+    этапа сохраняется в `app.state.startup_phases` (см. benchmarks/startup.py).
+    """
+    phases = {}
+
+    async def timed(name: str, step: Awaitable) -> None:
+        started = time.perf_counter()
+        try:
+            await step
+        finally:
+            phases[name] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await timed("schema_check", init_db())
+    await asyncio.gather(
+        timed("db_pool", warm_up_pools()),
+        timed("redis", init_redis()),
+        timed("password_hasher", PasswordHasher.warm_up()),
+    )
+    phases["total"] = time.perf_counter() - started
+    app.state.startup_phases = phases
+
+    details = ", ".join(f"{name}={duration * 1000:.0f}ms" for name, duration in phases.items() if name != "total")
+    logger.info(f"Приложение успешно запущено за {phases['total'] * 1000:.0f} мс ({details})")
+
+    # Снимки метрик воркера для /metrics любого воркера, см. app.metrics.render
+    metrics_flusher = None
+    if config.METRICS_ENABLED and config.METRICS_MULTIPROCESS_DIR:
+        metrics_flusher = asyncio.create_task(
+            flush_snapshots(config.METRICS_MULTIPROCESS_DIR, config.METRICS_FLUSH_INTERVAL)
+        )
     yield
 
+    if metrics_flusher is not None:
+        metrics_flusher.cancel()
+        write_snapshot(config.METRICS_MULTIPROCESS_DIR)
+    await TaskEventBroker.close()
     await close_redis()
+    await dispose_engines()
+    PasswordHasher.shutdown()
 
 
 app = FastAPI(title="task_manager", lifespan=lifespan)
+app.add_exception_handler(UserNotFoundError, user_not_found_handler)
 
 
 main_api_router = APIRouter()
@@ -31,6 +82,36 @@ main_api_router = APIRouter()
 main_api_router.include_router(router)
 
 app.include_router(main_api_router)
+app.include_router(health_router)
+
+if config.METRICS_ENABLED:
+    for instrumented_engine in [engine, *replica_engines]:
+        instrument_engine(instrumented_engine)
+
+    GaugeCollector("db_pool", "SQLAlchemy connection pool state", lambda: {
+        ((name,), key): value
+        for name, pool_engine in [("primary", engine)] + [(f"replica{i}", e) for i, e in enumerate(replica_engines)]
+        for key, value in pool_stats(pool_engine).items()
+    }, labelnames=("engine",))
+    GaugeCollector("redis_pool", "Redis connection pool state", redis_pool_stats)
+    GaugeCollector("password_hasher", "bcrypt worker pool state", PasswordHasher.stats)
+    GaugeCollector("task_list_cache", "Task list cache counters", TaskListCache.stats)
+    GaugeCollector("jwt_cache", "Verified JWT cache state", AuthService.token_cache.stats)
+    GaugeCollector("principal_cache", "Principal LRU cache state", PrincipalResolver.local_cache.stats)
+    GaugeCollector("rate_limiter", "Rate limiter decisions", RateLimiter.stats)
+    GaugeCollector("task_events", "Task event stream connections and counters", TaskEventBroker.stats)
+
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+if config.PROFILING_ENABLED:
+    from app.profiling import ProfilingMiddleware, capture_sql
+
+    for profiled_engine in [engine, *replica_engines]:
+        capture_sql(profiled_engine)
+    app.add_middleware(ProfilingMiddleware)
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
@@ -0,0 +1,342 @@
+import asyncio
+import bisect
+import glob
+import json
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from fastapi import APIRouter
+from sqlalchemy import event
+from fastapi.responses import PlainTextResponse
+from loguru import logger
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import config
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+@dataclass
+class RequestTimings:
+    """Время, потраченное на внешние вызовы в рамках одного запроса"""
+    db_time: float = 0.0
+    db_statements: int = 0
+    redis_time: float = 0.0
+    redis_calls: int = 0
+    auth_time: float = 0.0
+
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+             for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def snapshot(self) -> list:
+        return [[list(labels), value] for labels, value in self._values.items()]
+
+    def aggregate(self, snapshots: dict[int, list]) -> list[str]:
+        """Сложить значения счётчика всех воркеров"""
+        values: dict[tuple, float] = {}
+        for snapshot in snapshots.values():
+            for labels, value in snapshot:
+                values[tuple(labels)] = values.get(tuple(labels), 0.0) + value
+        return self.collect(values)
+
+    def collect(self, values: Optional[dict] = None) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in (self._values if values is None else values).items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values: dict[tuple, list] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels) -> None:
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[0][index] += 1
+        state[1] += value
+        state[2] += 1
+
+    def snapshot(self) -> list:
+        return [[list(labels), *state] for labels, state in self._values.items()]
+
+    def aggregate(self, snapshots: dict[int, list]) -> list[str]:
+        """Сложить гистограммы всех воркеров по корзинам"""
+        values: dict[tuple, list] = {}
+        for snapshot in snapshots.values():
+            for labels, bucket_counts, total, count in snapshot:
+                state = values.setdefault(tuple(labels), [[0] * len(self.buckets), 0.0, 0])
+                state[0] = [a + b for a, b in zip(state[0], bucket_counts)]
+                state[1] += total
+                state[2] += count
+        return self.collect(values)
+
+    def collect(self, values: Optional[dict] = None) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        labelnames = self.labelnames + ("le",)
+        for labels, (bucket_counts, total, count) in (self._values if values is None else values).items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(labelnames, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(labelnames, labels + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class GaugeCollector:
+    """
+    Набор gauge-метрик, значения которых считываются в момент запроса `/metrics`.
+
+    `collect_fn` возвращает словарь `имя -> значение` или `(метки, значение) -> ...` для `labelnames`.
+    """
+
+    def __init__(self, prefix: str, documentation: str, collect_fn: Callable[[], dict],
+                 labelnames: tuple[str, ...] = ()):
+        self.name = prefix
+        self.prefix = prefix
+        self.documentation = documentation
+        self.collect_fn = collect_fn
+        self.labelnames = labelnames
+        REGISTRY.append(self)
+
+    def snapshot(self) -> list:
+        samples = []
+        for key, value in self.collect_fn().items():
+            labels, name = key if isinstance(key, tuple) else ((), key)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            samples.append([list(labels), name, value])
+        return samples
+
+    def aggregate(self, snapshots: dict[int, list]) -> list[str]:
+        """Значения каждого воркера с меткой `pid`: состояние пулов и кэшей не складывается между процессами"""
+        samples = [[[pid, *labels], name, value]
+                   for pid, snapshot in snapshots.items() for labels, name, value in snapshot]
+        return self.collect(samples, ("pid",) + self.labelnames)
+
+    def collect(self, samples: Optional[list] = None, labelnames: Optional[tuple[str, ...]] = None) -> list[str]:
+        by_name: dict[str, list[str]] = {}
+        for labels, name, value in self.snapshot() if samples is None else samples:
+            by_name.setdefault(name, []).append(
+                f"{self.prefix}_{name}{_format_labels(labelnames or self.labelnames, labels)} {value}"
+            )
+        lines = []
+        for name, values in by_name.items():
+            lines.append(f"# HELP {self.prefix}_{name} {self.documentation}")
+            lines.append(f"# TYPE {self.prefix}_{name} gauge")
+            lines.extend(values)
+        return lines
+
+
+REGISTRY: list = []
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency",
+                            ("method", "route", "status"))
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "Time spent in SQL statements per request",
+                            ("method", "route"))
+REQUEST_DB_STATEMENTS = Histogram("http_request_db_statements", "SQL statements executed per request",
+                                  ("method", "route"), buckets=COUNT_BUCKETS)
+REQUEST_REDIS_TIME = Histogram("http_request_redis_seconds", "Time spent in Redis calls per request",
+                               ("method", "route"))
+REQUEST_AUTH_TIME = Histogram("http_request_auth_seconds", "Time spent in bcrypt and JWT per request",
+                              ("method", "route"))
+DB_STATEMENT_TIME = Histogram("db_statement_duration_seconds", "SQL statement execution time")
+REDIS_COMMAND_TIME = Histogram("redis_command_duration_seconds", "Redis command round trip time", ("command",))
+AUTH_OPERATION_TIME = Histogram("auth_operation_duration_seconds", "bcrypt and JWT operation time",
+                                ("operation",))
+
+
+def observe_db(elapsed: float) -> None:
+    DB_STATEMENT_TIME.observe(elapsed)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.db_time += elapsed
+        timings.db_statements += 1
+
+
+def observe_redis(command: str, elapsed: float) -> None:
+    REDIS_COMMAND_TIME.observe(elapsed, command)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.redis_time += elapsed
+        timings.redis_calls += 1
+
+
+def observe_auth(operation: str, elapsed: float) -> None:
+    AUTH_OPERATION_TIME.observe(elapsed, operation)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.auth_time += elapsed
+
+
+def instrument_engine(engine) -> None:
+    """Подписаться на события выполнения SQL движка для учёта времени запросов"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        observe_db(time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            observe_db(time.perf_counter() - conn.info["query_started"].pop())
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{pid}.json")
+
+
+def write_snapshot(directory: str) -> None:
+    """Записать метрики процесса в `directory` для сборки метрик всех воркеров (см. `render`)"""
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory, os.getpid())
+    with open(path + ".tmp", "w") as snapshot_file:
+        json.dump({metric.name: metric.snapshot() for metric in REGISTRY}, snapshot_file)
+    os.replace(path + ".tmp", path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_snapshots(directory: str) -> dict[int, dict]:
+    """Снимки метрик воркеров из `directory` по pid"""
+    snapshots = {}
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path) as snapshot_file:
+                snapshots[int(os.path.basename(path).removesuffix(".json"))] = json.load(snapshot_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping metrics snapshot {path}: {e}")
+    return snapshots
+
+
+async def flush_snapshots(directory: str, interval: float) -> None:
+    """Периодически записывать снимок метрик процесса, пока задача не отменена"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            write_snapshot(directory)
+        except OSError as e:
+            logger.warning(f"Failed to write metrics snapshot: {e}")
+
+
+def render() -> str:
+    """
+    Метрики в текстовом формате Prometheus.
+
+    Без `METRICS_MULTIPROCESS_DIR` отдаются метрики текущего процесса. С ним каждый воркер раз
+    в `METRICS_FLUSH_INTERVAL` секунд записывает снимок в общий каталог, и `/metrics` в любом воркере
+    складывает счётчики и гистограммы всех воркеров, в том числе завершившихся, чтобы суммы не убывали.
+    Gauge-метрики отдаются с меткой `pid` только для живых процессов.
+    """
+    directory = config.METRICS_MULTIPROCESS_DIR
+    lines = []
+    if not directory:
+        for metric in REGISTRY:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+    write_snapshot(directory)
+    snapshots = read_snapshots(directory)
+    alive = {pid for pid in snapshots if _pid_alive(pid)}
+    for metric in REGISTRY:
+        metric_snapshots = {pid: snapshot.get(metric.name, []) for pid, snapshot in snapshots.items()
+                            if pid in alive or not isinstance(metric, GaugeCollector)}
+        lines.extend(metric.aggregate(metric_snapshots))
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware, измеряющее задержку запроса и время в БД, Redis и аутентификации по методу и маршруту.
+
+    Маршрут берётся из шаблона пути FastAPI (`/tasks/{task_id}`), запросы вне маршрутов
+    попадают в метку `unmatched`, чтобы число рядов не зависело от URL.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_timings.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.observe(elapsed, method, route_path, str(status_code))
+            REQUEST_DB_TIME.observe(timings.db_time, method, route_path)
+            REQUEST_DB_STATEMENTS.observe(timings.db_statements, method, route_path)
+            REQUEST_REDIS_TIME.observe(timings.redis_time, method, route_path)
+            REQUEST_AUTH_TIME.observe(timings.auth_time, method, route_path)
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики в текстовом формате Prometheus: процесса или всех воркеров, см. `render`"""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,140 @@
+import asyncio
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
+from loguru import logger
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from starlette import status
+
+from app.auth import AuthService, oauth2_scheme
+from app.cache import LRUCache
+from app.pydantic_models import Principal
+from config import config
+from database.db import AsyncSession, get_read_db
+from database.mod import UserInDB, UserNotFoundError
+from database.redis import get_redis
+from database.routing import get_user_by_username
+
+
+class PrincipalResolver:
+    """
+    Разрешение аутентифицированного пользователя (username -> user_id).
+
+    Используется цепочка: in-process LRU -> Redis -> PostgreSQL, найденный id кэшируется на обоих уровнях.
+    Токен с claim `uid` принимается, только если разрешённый id совпадает с ним, поэтому токены удалённого
+    пользователя (в том числе после повторной регистрации того же username) отклоняются. При удалении через ORM
+    кэш сбрасывается сразу; в других процессах запись LRU живёт не дольше `PRINCIPAL_LOCAL_CACHE_TTL`,
+    а запись задач для удалённого пользователя в это окно отклоняется `user_not_found_handler`.
+    """
+
+    local_cache = LRUCache(maxsize=config.PRINCIPAL_CACHE_SIZE, ttl=config.PRINCIPAL_LOCAL_CACHE_TTL)
+
+    @staticmethod
+    def _redis_key(username: str) -> str:
+        return f"principal:{username}"
+
+    @classmethod
+    async def resolve(cls, session: AsyncSession, username: str) -> Optional[Principal]:
+        """
+        Получить пользователя по username через кэш.
+
+        **Параметры**:
+        - `session` (AsyncSession): Сессия чтения, используется только при промахе кэша.
+        - `username` (str): Имя пользователя из токена.
+
+        **Возвращает**:
+        - `Principal`: Идентификатор и имя пользователя.
+        - `None`: Если пользователь не найден.
+        """
+        user_id = cls.local_cache.get(username)
+        if user_id is not None:
+            return Principal(id=user_id, username=username)
+
+        try:
+            redis_conn = await get_redis()
+            cached = await redis_conn.get(cls._redis_key(username))
+        except RedisError as e:
+            logger.warning(f"Principal cache unavailable: {e}")
+            cached = None
+        if cached is not None:
+            user_id = int(cached)
+            cls.local_cache.set(username, user_id)
+            return Principal(id=user_id, username=username)
+
+        user = await get_user_by_username(session, username)
+        if not user:
+            return None
+        await cls.remember(user.id, username)
+        return Principal(id=user.id, username=username)
+
+    @classmethod
+    async def remember(cls, user_id: int, username: str) -> None:
+        """Положить соответствие username -> user_id в оба уровня кэша"""
+        cls.local_cache.set(username, user_id)
+        try:
+            redis_conn = await get_redis()
+            await redis_conn.setex(cls._redis_key(username), config.PRINCIPAL_CACHE_TTL, user_id)
+        except RedisError as e:
+            logger.warning(f"Principal cache unavailable: {e}")
+
+    @classmethod
+    async def invalidate(cls, username: str) -> None:
+        """Удалить пользователя из кэша (вызывается при удалении пользователя)"""
+        cls.local_cache.pop(username)
+        try:
+            redis_conn = await get_redis()
+            await redis_conn.delete(cls._redis_key(username))
+        except RedisError as e:
+            logger.warning(f"Principal cache invalidation failed for {username}: {e}")
+
+
+@event.listens_for(UserInDB, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: UserInDB):
+    """Сбрасывает кэш principal при удалении пользователя через ORM"""
+    PrincipalResolver.local_cache.pop(target.username)
+    asyncio.get_running_loop().create_task(PrincipalResolver.invalidate(target.username))
+
+
+async def get_current_principal(token: str = Depends(oauth2_scheme),
+                                session: AsyncSession = Depends(get_read_db)) -> Principal:
+    """
+    FastAPI-зависимость, возвращающая текущего пользователя по токену доступа.
+
+    **Ошибки**:
+    - 401: Если токен некорректен или пользователь не найден.
+    """
+    payload = AuthService.decode_access_token(token)
+    username = payload.get("sub") if payload else None
+    if username is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    user_id = payload.get("uid")
+    principal = await PrincipalResolver.resolve(session, username)
+    if principal is None or (user_id is not None and principal.id != user_id):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+
+async def user_not_found_handler(request: Request, exc: UserNotFoundError) -> JSONResponse:
+    """
+    Ответ 401 на запись задач пользователя, удалённого после выдачи токена.
+
+    Токен уже прошёл проверку по кэшу principal, но строки пользователя в базе нет: кэш в этом процессе
+    ещё не узнал об удалении. Запись задач в таком случае отклоняется так же, как недействительный токен.
+    """
+    logger.warning(f"Rejected task write for deleted user {exc.user_id}")
+    return JSONResponse(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        content={"detail": "Could not validate credentials"},
+        headers={"WWW-Authenticate": "Bearer"},
+    )
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import event
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config import config
+
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+class SamplingProfiler(threading.Thread):
+    """
+    Сэмплирующий профилировщик потока event loop.
+
+    Отдельный поток раз в `interval` секунд снимает стек целевого потока через `sys._current_frames()`.
+    Стек включает всё, что в этот момент выполняет event loop, в том числе конкурентные запросы.
+    """
+
+    def __init__(self, target_thread_id: int, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.stacks: Counter[tuple[tuple[str, str, int], ...]] = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_qualname, code.co_filename, frame.f_lineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class RequestProfile:
+    """Профиль одного запроса: сэмплы стеков и выполненные SQL-запросы"""
+
+    _active = 0
+    _lock = threading.Lock()
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.sql: list[tuple[float, str]] = []
+        self.started = time.perf_counter()
+        self.profiler = SamplingProfiler(threading.get_ident(), config.PROFILING_INTERVAL_MS / 1000)
+
+    @classmethod
+    def try_start(cls, method: str, path: str) -> Optional["RequestProfile"]:
+        """Начать профилирование, если не превышен лимит одновременных профилей"""
+        with cls._lock:
+            if cls._active >= config.PROFILING_MAX_CONCURRENT:
+                return None
+            cls._active += 1
+        profile = cls(method, path)
+        profile.profiler.start()
+        return profile
+
+    def stop(self) -> float:
+        self.profiler.stop()
+        with self._lock:
+            RequestProfile._active -= 1
+        return time.perf_counter() - self.started
+
+    def collapsed(self) -> str:
+        """Стеки в формате collapsed (flamegraph.pl, speedscope, inferno)"""
+        lines = []
+        for stack, count in self.profiler.stacks.items():
+            lines.append(";".join(f"{name} ({os.path.basename(file)}:{line})" for name, file, line in stack)
+                         + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, elapsed: float) -> str:
+        """Профиль в формате speedscope (sampled)"""
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.profiler.stacks.items():
+            sample = []
+            for name, file, line in stack:
+                if (name, file, line) not in index:
+                    index[(name, file, line)] = len(frames)
+                    frames.append({"name": name, "file": file, "line": line})
+                sample.append(index[(name, file, line)])
+            samples.append(sample)
+            weights.append(count * self.profiler.interval)
+        return json.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "task_manager",
+            "name": f"{self.method} {self.path}",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path}",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": elapsed,
+                "samples": samples,
+                "weights": weights,
+            }],
+        })
+
+    def save(self, route: str, elapsed: float) -> str:
+        """Записать профиль и SQL-запросы в `PROFILING_DIR`, вернуть путь к профилю"""
+        os.makedirs(config.PROFILING_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S.%f")
+        slug = route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+        base = os.path.join(config.PROFILING_DIR, f"{stamp}_{self.method}_{slug}_{elapsed * 1000:.0f}ms")
+
+        if config.PROFILING_FORMAT == "speedscope":
+            path = base + ".speedscope.json"
+            content = self.speedscope(elapsed)
+        else:
+            path = base + ".collapsed"
+            content = self.collapsed()
+        with open(path, "w") as f:
+            f.write(content)
+        with open(base + ".sql", "w") as f:
+            for duration, statement in self.sql:
+                f.write(f"-- {duration * 1000:.2f} ms\n{statement};\n\n")
+        return path
+
+
+def capture_sql(engine) -> None:
+    """Сохранять SQL-запросы, выполненные во время профилируемого запроса"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_profile.get() is not None:
+            conn.info.setdefault("profile_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = current_profile.get()
+        if profile is not None and conn.info.get("profile_query_started"):
+            profile.sql.append((time.perf_counter() - conn.info["profile_query_started"].pop(), statement))
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование отдельных запросов.
+
+    Запрос профилируется, если передан заголовок `X-Profile` со значением `PROFILING_HEADER_TOKEN`
+    (профиль сохраняется всегда), либо попал в случайную выборку `PROFILING_SAMPLE_RATE`
+    (профиль сохраняется, только если запрос дольше `PROFILING_SLOW_THRESHOLD_MS`).
+    Middleware подключается только при `PROFILING_ENABLED`, иначе накладных расходов нет.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.header_token = config.PROFILING_HEADER_TOKEN.encode() if config.PROFILING_HEADER_TOKEN else None
+
+    def _requested(self, scope: Scope) -> bool:
+        if self.header_token is None:
+            return False
+        return any(name == b"x-profile" and value == self.header_token for name, value in scope["headers"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        forced = self._requested(scope)
+        if not forced and random.random() >= config.PROFILING_SAMPLE_RATE:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile.try_start(scope["method"], scope["path"])
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_profile.reset(token)
+            elapsed = profile.stop()
+            if forced or elapsed * 1000 >= config.PROFILING_SLOW_THRESHOLD_MS:
+                route = getattr(scope.get("route"), "path", scope["path"])
+                path = await asyncio.to_thread(profile.save, route, elapsed)
+                logger.info(f"Profile for {scope['method']} {scope['path']} ({elapsed * 1000:.0f} ms) saved to {path}")
@@ -29,6 +29,12 @@ class UserOut(User):
     id: int
 
 
+class Principal(TunedModel):
+    """Аутентифицированный пользователь, полученный из токена доступа"""
+    id: int
+    username: str
+
+
 # Модели для Task
 class TaskBase(TunedModel):
     title: str
@@ -53,3 +59,58 @@ class TaskInDB(TaskBase):
 
 class TaskOut(TaskInDB):
     pass
+
+
+class TaskSearchResult(TaskOut):
+    rank: float
+    title_highlight: Optional[str] = None
+    description_highlight: Optional[str] = None
+
+
+# Модели для синхронизации изменений задач
+class TaskChange(TaskOut):
+    revision: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class TaskChanges(TunedModel):
+    revision: int  # Ревизия, которую нужно передать в `since` при следующей синхронизации
+    has_more: bool
+    upserts: List[TaskChange]
+    deleted: List[int]
+
+
+class TaskStats(TunedModel):
+    total: int
+    completed: int
+    open: int
+
+
+# Модели для пакетных операций с задачами
+class TaskBatchUpdate(TaskUpdate):
+    id: int
+
+
+class TaskBatchDelete(TunedModel):
+    ids: List[int]
+
+
+class TaskBatchResult(TunedModel):
+    id: int
+    ok: bool
+    task: Optional[TaskOut] = None
+    error: Optional[str] = None
+
+
+# Модели для импорта задач
+class TaskImportError(TunedModel):
+    line: int
+    error: str
+
+
+class TaskImportResult(TunedModel):
+    imported: int
+    skipped: int
+    chunks: int
+    errors: List[TaskImportError]  # Не больше TASKS_IMPORT_MAX_ERRORS первых ошибок
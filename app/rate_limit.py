@@ -0,0 +1,154 @@
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordRequestForm
+from loguru import logger
+from redis.exceptions import RedisError
+from starlette import status
+
+from app.cache import LRUCache
+from config import config
+from database.redis import get_redis
+
+# Token bucket: KEYS[1] - ключ корзины; ARGV[1] - ёмкость, ARGV[2] - пополнение в токенах за миллисекунду.
+# Время берётся из Redis, чтобы все процессы считали по одним часам.
+# Возвращает {1, 0}, если запрос пропущен, или {0, миллисекунд до появления токена}.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed, retry_after = 0, 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate))
+return {allowed, retry_after}
+"""
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Бюджет запросов: `limit` запросов за `period` секунд с равномерным пополнением"""
+    limit: int
+    period: float
+
+    @classmethod
+    def parse(cls, value: str) -> "Budget":
+        """Разобрать строку вида `10/minute` или `100/3600`"""
+        limit, _, period = value.partition("/")
+        return cls(int(limit), PERIODS.get(period.strip()) or float(period))
+
+    @property
+    def rate_per_ms(self) -> float:
+        return self.limit / (self.period * 1000)
+
+
+class RateLimiter:
+    """
+    Ограничение частоты запросов по алгоритму token bucket в Redis.
+
+    Проверка и списание токена выполняются атомарно одним Lua-скриптом. Если Redis отказал в запросе,
+    ключ блокируется и в локальном кэше процесса до момента появления токена: последующие запросы с тем же
+    ключом отклоняются без обращения к Redis. При недоступности Redis запросы пропускаются.
+    """
+
+    blocked = LRUCache(maxsize=config.RATE_LIMIT_LOCAL_CACHE_SIZE)
+    _script = None
+
+    allowed = 0
+    limited = 0
+    limited_locally = 0
+    errors = 0
+
+    @classmethod
+    async def hit(cls, key: str, budget: Budget) -> Optional[float]:
+        """Списать токен для `key`; вернуть число секунд до следующей попытки или None, если запрос разрешён"""
+        blocked_until = cls.blocked.get(key)
+        if blocked_until is not None:
+            cls.limited_locally += 1
+            return max(blocked_until - time.monotonic(), 0.001)
+
+        try:
+            redis_conn = await get_redis()
+            if cls._script is None:
+                cls._script = redis_conn.register_script(TOKEN_BUCKET_SCRIPT)
+            allowed, retry_after_ms = await cls._script(keys=[f"ratelimit:{key}"],
+                                                        args=[budget.limit, budget.rate_per_ms],
+                                                        client=redis_conn)
+        except RedisError as e:
+            cls.errors += 1
+            logger.warning(f"Rate limiter unavailable, request allowed: {e}")
+            return None
+
+        if allowed:
+            cls.allowed += 1
+            return None
+        cls.limited += 1
+        retry_after = int(retry_after_ms) / 1000
+        cls.blocked.set(key, time.monotonic() + retry_after, ttl=retry_after)
+        return retry_after
+
+    @classmethod
+    async def check(cls, key: str, budget: Budget) -> None:
+        """
+        Проверить бюджет для ключа.
+
+        **Ошибки**:
+        - 429: Если бюджет исчерпан; заголовок `Retry-After` содержит число секунд до следующей попытки.
+        """
+        if not config.RATE_LIMIT_ENABLED:
+            return
+        retry_after = await cls.hit(key, budget)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "allowed": cls.allowed,
+            "limited": cls.limited,
+            "limited_locally": cls.limited_locally,
+            "errors": cls.errors,
+            "blocked_keys": len(cls.blocked),
+        }
+
+
+def limit_by_ip(scope: str, budget: str) -> Callable:
+    """FastAPI-зависимость, ограничивающая запросы к маршруту с одного IP-адреса"""
+    parsed = Budget.parse(budget)
+
+    async def dependency(request: Request) -> None:
+        client_ip = request.client.host if request.client else "unknown"
+        await RateLimiter.check(f"{scope}:ip:{client_ip}", parsed)
+
+    return dependency
+
+
+def limit_by_username(scope: str, budget: str) -> Callable:
+    """FastAPI-зависимость, ограничивающая попытки входа под одним именем пользователя с любых адресов"""
+    parsed = Budget.parse(budget)
+
+    async def dependency(form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+        await RateLimiter.check(f"{scope}:user:{form_data.username}", parsed)
+
+    return dependency
@@ -0,0 +1,40 @@
+from typing import Iterable, List, Mapping
+
+from pydantic import TypeAdapter
+
+from app.pydantic_models import TaskOut
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен, без него используется pydantic-core
+    orjson = None
+
+task_list_adapter = TypeAdapter(List[TaskOut])
+task_adapter = TypeAdapter(TaskOut)
+
+TASK_FIELDS = tuple(TaskOut.model_fields)
+
+
+def _as_dicts(rows: Iterable[Mapping]) -> list[dict]:
+    return [{field: row[field] for field in TASK_FIELDS} for row in rows]
+
+
+def dump_tasks(rows: Iterable[Mapping]) -> bytes:
+    """
+    Сериализовать строки задач (RowMapping или dict с полями TaskOut) в JSON-массив.
+
+    Строки уже имеют типы колонок модели, поэтому валидация pydantic не нужна: при наличии orjson
+    список словарей кодируется напрямую, иначе через заранее собранный TypeAdapter без промежуточных моделей.
+    """
+    tasks = _as_dicts(rows)
+    if orjson is not None:
+        return orjson.dumps(tasks)
+    return task_list_adapter.dump_json(tasks, warnings=False)
+
+
+def dump_task(row: Mapping) -> bytes:
+    """Сериализовать одну строку задачи в JSON-объект (используется для NDJSON)"""
+    task = {field: row[field] for field in TASK_FIELDS}
+    if orjson is not None:
+        return orjson.dumps(task)
+    return task_adapter.dump_json(task, warnings=False)
@@ -0,0 +1,99 @@
+"""
+Запуск приложения в production: несколько процессов-воркеров с плавной остановкой.
+
+    python -m app.server
+
+Параметры берутся из настроек `SERVER_*`. Пулы соединений с базой (`DB_POOL_SIZE`, `DB_MAX_OVERFLOW`)
+и Redis (`REDIS_MAX_CONNECTIONS`) создаются в каждом воркере отдельно, поэтому суммарное число соединений
+равно размеру пула, умноженному на `SERVER_WORKERS`; оно выводится в лог при запуске.
+Метрики всех воркеров собираются через каталог `METRICS_MULTIPROCESS_DIR` (см. app/metrics.py).
+"""
+import asyncio
+import glob
+import importlib.util
+import os
+import socket
+from typing import Optional
+
+import uvicorn
+from loguru import logger
+from uvicorn.supervisors import Multiprocess
+
+from config import config
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    Сервер uvicorn с предварительным переводом воркера в режим drain при остановке.
+
+    По сигналу завершения `/health/ready` начинает отвечать 503, а потоки событий закрываются. Затем,
+    через `SERVER_DRAIN_DELAY` секунд (время, за которое балансировщик исключает процесс), uvicorn перестаёт
+    принимать соединения и ждёт завершения текущих запросов не дольше `SERVER_GRACEFUL_TIMEOUT`.
+    После этого выполняется остановка приложения: закрываются пулы базы и Redis.
+    """
+
+    async def shutdown(self, sockets: Optional[list[socket.socket]] = None) -> None:
+        from app.health import Readiness
+
+        Readiness.start_draining()
+        if config.SERVER_DRAIN_DELAY > 0:
+            logger.info(f"Draining for {config.SERVER_DRAIN_DELAY:g}s before closing listeners")
+            await asyncio.sleep(config.SERVER_DRAIN_DELAY)
+        await super().shutdown(sockets=sockets)
+
+
+def _resolve(option: str, module: str, fallback: str) -> str:
+    """Для `auto` выбрать необязательную реализацию (uvloop, httptools), если она установлена"""
+    if option != "auto":
+        return option
+    return module if importlib.util.find_spec(module) is not None else fallback
+
+
+def build_config() -> uvicorn.Config:
+    return uvicorn.Config(
+        "app.main:app",
+        host=config.SERVER_HOST,
+        port=config.SERVER_PORT,
+        workers=config.SERVER_WORKERS,
+        loop=_resolve(config.SERVER_LOOP, "uvloop", "asyncio"),
+        http=_resolve(config.SERVER_HTTP, "httptools", "h11"),
+        backlog=config.SERVER_BACKLOG,
+        timeout_keep_alive=config.SERVER_KEEPALIVE_TIMEOUT,
+        limit_concurrency=config.SERVER_LIMIT_CONCURRENCY or None,
+        timeout_graceful_shutdown=config.SERVER_GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=config.SERVER_FORWARDED_ALLOW_IPS,
+        access_log=config.SERVER_ACCESS_LOG,
+        lifespan="on",
+    )
+
+
+def main() -> None:
+    server_config = build_config()
+    workers = server_config.workers
+    logger.info(
+        f"Starting {workers} worker(s), loop={server_config.loop}, http={server_config.http}; connections up to "
+        f"{workers * (config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW)} to the database "
+        f"and {workers * config.REDIS_MAX_CONNECTIONS} to Redis"
+    )
+
+    if config.METRICS_ENABLED and config.METRICS_MULTIPROCESS_DIR:
+        # Снимки прошлого запуска не должны попасть в суммы счётчиков новых воркеров
+        os.makedirs(config.METRICS_MULTIPROCESS_DIR, exist_ok=True)
+        for path in glob.glob(os.path.join(config.METRICS_MULTIPROCESS_DIR, "*.json")):
+            os.remove(path)
+    elif config.METRICS_ENABLED and workers > 1:
+        logger.warning("METRICS_MULTIPROCESS_DIR is not set: /metrics reports only the worker that serves the scrape")
+
+    server = DrainingServer(server_config)
+    if workers > 1:
+        # Воркеры принимают соединения на общем сокете; супервизор перезапускает упавшие воркеры
+        # и по SIGTERM останавливает их, каждый воркер при этом выполняет плавную остановку
+        sock = server_config.bind_socket()
+        Multiprocess(server_config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
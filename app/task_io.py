@@ -0,0 +1,155 @@
+import csv
+import io
+from typing import AsyncIterator, Awaitable, Callable, Mapping, Union
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from starlette import status
+
+from app.pydantic_models import TaskBase, TaskImportError, TaskImportResult
+from config import config
+
+CSV_EXPORT_FIELDS = ("id", "title", "description", "status")
+CSV_IMPORT_FIELDS = tuple(TaskBase.model_fields)
+
+IMPORT_MEDIA_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+# Запись импорта: номер строки во входных данных и JSON-строка (NDJSON) или словарь полей (CSV)
+ImportRecord = tuple[int, Union[bytes, dict]]
+
+
+def _line_too_long(line_no: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Record at line {line_no} exceeds {config.TASKS_IMPORT_MAX_LINE_BYTES} bytes",
+    )
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, bytes]]:
+    """
+    Разбить поток байтов на строки по мере поступления.
+
+    В памяти держится только незавершённая строка; строка длиннее `TASKS_IMPORT_MAX_LINE_BYTES`
+    прерывает импорт, чтобы тело без переводов строк не накапливалось целиком.
+    """
+    line_no = 0
+    tail = b""
+    async for chunk in chunks:
+        *lines, tail = (tail + chunk).split(b"\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, line
+        if len(tail) > config.TASKS_IMPORT_MAX_LINE_BYTES:
+            raise _line_too_long(line_no + 1)
+    if tail:
+        yield line_no + 1, tail
+
+
+async def read_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRecord]:
+    """Записи NDJSON: по одному JSON-объекту задачи на строку, пустые строки пропускаются"""
+    async for line_no, line in _lines(chunks):
+        if line.strip():
+            yield line_no, line
+
+
+async def read_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRecord]:
+    """
+    Записи CSV с заголовком; используются колонки `title`, `description`, `status`, остальные игнорируются.
+
+    Поле в кавычках может содержать перевод строки, поэтому строки копятся, пока число кавычек в записи
+    нечётно. Пустые значения считаются отсутствующими, и для них берутся значения по умолчанию.
+    """
+    header = None
+    pending: list[str] = []
+    pending_size = 0
+    quotes = 0
+    start = 0
+    async for line_no, line in _lines(chunks):
+        text = line.decode("utf-8", errors="replace")
+        if header is None:
+            text = text.removeprefix("\ufeff")
+        if not pending:
+            start = line_no
+            if not text.strip():
+                continue
+        pending.append(text + "\n")
+        pending_size += len(line)
+        quotes += text.count('"')
+        if quotes % 2:
+            if pending_size > config.TASKS_IMPORT_MAX_LINE_BYTES:
+                raise _line_too_long(start)
+            continue
+        values = next(csv.reader(pending))
+        pending, pending_size, quotes = [], 0, 0
+
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            if "title" not in header:
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                    detail="CSV header must contain a 'title' column")
+            continue
+        yield start, _csv_record(header, values)
+    if pending and header is not None:
+        # Незакрытая кавычка в конце данных: запись проверяется как есть
+        yield start, _csv_record(header, next(csv.reader(pending)))
+
+
+def _csv_record(header: list[str], values: list[str]) -> dict:
+    return {name: value for name, value in zip(header, values) if name in CSV_IMPORT_FIELDS and value != ""}
+
+
+def parse_task(record: Union[bytes, dict]) -> TaskBase:
+    """Проверить запись импорта моделью TaskBase; JSON разбирается сразу pydantic-core"""
+    if isinstance(record, bytes):
+        return TaskBase.model_validate_json(record)
+    return TaskBase.model_validate(record)
+
+
+async def import_records(records: AsyncIterator[ImportRecord],
+                         load_chunk: Callable[[list[dict]], Awaitable[int]]) -> TaskImportResult:
+    """
+    Загрузить задачи из потока записей порциями по `TASKS_IMPORT_CHUNK_SIZE`.
+
+    Каждая порция передаётся в `load_chunk`, который вставляет и фиксирует её, поэтому в памяти держится
+    не больше одной порции, а уже загруженные порции сохраняются, даже если импорт прервётся.
+    Некорректные записи пропускаются; первые `TASKS_IMPORT_MAX_ERRORS` из них попадают в отчёт.
+    """
+    result = TaskImportResult(imported=0, skipped=0, chunks=0, errors=[])
+    chunk: list[dict] = []
+    async for line_no, record in records:
+        try:
+            chunk.append(parse_task(record).model_dump())
+        except ValidationError as e:
+            result.skipped += 1
+            if len(result.errors) < config.TASKS_IMPORT_MAX_ERRORS:
+                error = e.errors(include_url=False)[0]
+                location = ".".join(str(part) for part in error["loc"])
+                message = f"{location}: {error['msg']}" if location else error["msg"]
+                result.errors.append(TaskImportError(line=line_no, error=message))
+            continue
+        if len(chunk) >= config.TASKS_IMPORT_CHUNK_SIZE:
+            result.imported += await load_chunk(chunk)
+            result.chunks += 1
+            chunk = []
+    if chunk:
+        result.imported += await load_chunk(chunk)
+        result.chunks += 1
+    return result
+
+
+async def export_csv(rows: AsyncIterator[Mapping]) -> AsyncIterator[str]:
+    """CSV-поток задач с заголовком; строки отдаются блоками примерно по 64 КБ"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_EXPORT_FIELDS)
+    async for row in rows:
+        writer.writerow((row["id"], row["title"], row["description"], "true" if row["status"] else "false"))
+        if buffer.tell() >= 65536:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,46 @@
+"""
+Сравнение пропускной способности декодирования JWT с кэшем проверенных токенов и без него.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.jwt_decode --tokens 100 --iterations 100000
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from app.auth import AuthService
+from config import config
+
+
+def run(tokens: list[str], iterations: int, cached: bool) -> float:
+    """Декодировать токены по кругу `iterations` раз и вернуть число декодирований в секунду"""
+    config.JWT_CACHE_ENABLED = cached
+    AuthService.token_cache.clear()
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        AuthService.decode_access_token(tokens[i % len(tokens)])
+    return iterations / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=100, help="число различных токенов (активных клиентов)")
+    parser.add_argument("--iterations", type=int, default=100_000, help="число декодирований в каждом прогоне")
+    args = parser.parse_args()
+
+    tokens = [
+        AuthService.create_access_token({"sub": f"user{i}", "uid": i}, expires_delta=timedelta(minutes=30))
+        for i in range(args.tokens)
+    ]
+
+    uncached = run(tokens, args.iterations, cached=False)
+    cached = run(tokens, args.iterations, cached=True)
+    print(f"tokens={args.tokens} iterations={args.iterations}")
+    print(f"uncached: {uncached:12,.0f} decodes/s")
+    print(f"cached:   {cached:12,.0f} decodes/s  (x{cached / uncached:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Нагрузочный тест API: задержки p50/p95/p99 и RPS по каждому эндпоинту.
+
+По умолчанию приложение запускается в том же процессе поверх SQLite (aiosqlite) и fakeredis,
+поэтому внешние сервисы не нужны. С `--url` нагрузка подаётся на уже запущенный сервер.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.loadtest --users 20 --tasks-per-user 50 --concurrency 32 --duration 30
+    python -m benchmarks.loadtest --url http://localhost:8000 --mix list=10,create=2,update=2
+
+Для прогона по запущенному серверу на нём нужно отключить лимиты входа и регистрации (`RATE_LIMIT_ENABLED=false`).
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+
+import httpx
+
+DEFAULT_MIX = "login=1,refresh=1,create=3,list=10,update=3,delete=1"
+
+
+@dataclass
+class VirtualUser:
+    username: str
+    password: str
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+    task_ids: list[int] = field(default_factory=list)
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+
+class Recorder:
+    """Сбор задержек и кодов ответа по эндпоинтам"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, name: str, request, expected: tuple[int, ...]) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        if response.status_code not in expected:
+            self.errors[name] += 1
+            return None
+        return response
+
+    def report(self, elapsed: float) -> str:
+        lines = [f"{'endpoint':<24}{'count':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            lines.append(
+                f"{name:<24}{len(values):>8}{self.errors[name]:>8}{len(values) / elapsed:>10.1f}"
+                f"{percentile(values, 50) * 1000:>10.2f}{percentile(values, 95) * 1000:>10.2f}"
+                f"{percentile(values, 99) * 1000:>10.2f}"
+            )
+        total = sum(len(values) for values in self.latencies.values())
+        lines.append(f"{'total':<24}{total:>8}{sum(self.errors.values()):>8}{total / elapsed:>10.1f}")
+        return "\n".join(lines)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Перцентиль по отсортированному списку (метод ближайшего ранга)"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(q / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+async def register(client: httpx.AsyncClient, rec: Recorder, user: VirtualUser):
+    response = await rec.call("POST /auth/register",
+                              client.post("/auth/register", json={"username": user.username,
+                                                                  "password": user.password}), (200,))
+    if response:
+        user.access_token = response.json()["access_token"]
+
+
+async def login(client: httpx.AsyncClient, rec: Recorder, user: VirtualUser):
+    response = await rec.call("POST /auth/login",
+                              client.post("/auth/login", data={"username": user.username,
+                                                               "password": user.password}), (200,))
+    if response:
+        data = response.json()
+        user.access_token, user.refresh_token = data["access_token"], data["refresh_token"]
+
+
+async def refresh(client: httpx.AsyncClient, rec: Recorder, user: VirtualUser):
+    if not user.refresh_token:
+        return await login(client, rec, user)
+    response = await rec.call("POST /auth/refresh",
+                              client.post("/auth/refresh", json={"refresh_token": user.refresh_token}), (200,))
+    if response:
+        data = response.json()
+        user.access_token, user.refresh_token = data["access_token"], data["refresh_token"]
+
+
+async def create(client: httpx.AsyncClient, rec: Recorder, user: VirtualUser):
+    task = {"title": f"task {uuid.uuid4().hex[:8]}", "description": "load test", "status": False}
+    response = await rec.call("POST /tasks", client.post("/tasks", json=task, headers=user.headers), (201,))
+    if response:
+        user.task_ids.append(response.json()["id"])
+
+
+async def list_tasks(client: httpx.AsyncClient, rec: Recorder, user: VirtualUser):
+    await rec.call("GET /tasks", client.get("/tasks", headers=user.headers), (200,))
+
+
+async def update(client: httpx.AsyncClient, rec: Recorder, user: VirtualUser):
+    if not user.task_ids:
+        return await create(client, rec, user)
+    task_id = random.choice(user.task_ids)
+    await rec.call("PUT /tasks/{id}", client.put(f"/tasks/{task_id}", json={"status": random.random() < 0.5},
+                                                 headers=user.headers), (200,))
+
+
+async def delete(client: httpx.AsyncClient, rec: Recorder, user: VirtualUser):
+    if not user.task_ids:
+        return await create(client, rec, user)
+    task_id = user.task_ids.pop(random.randrange(len(user.task_ids)))
+    await rec.call("DELETE /tasks/{id}", client.delete(f"/tasks/{task_id}", headers=user.headers), (204,))
+
+
+SCENARIOS = {
+    "login": login,
+    "refresh": refresh,
+    "create": create,
+    "list": list_tasks,
+    "update": update,
+    "delete": delete,
+}
+
+
+@asynccontextmanager
+async def in_process_client() -> AsyncIterator[httpx.AsyncClient]:
+    """Клиент к приложению, поднятому в этом процессе поверх SQLite и fakeredis"""
+    import fakeredis
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="task_manager_bench_"), "bench.db")
+    os.environ["URL_DB"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ.setdefault("URL_DB_REPLICAS", "")
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "true"
+    # Все виртуальные пользователи приходят с одного адреса, лимиты входа и регистрации их бы отсекли
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    import database.redis
+    database.redis.redis_instance = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+
+
+@asynccontextmanager
+async def remote_client(url: str, concurrency: int) -> AsyncIterator[httpx.AsyncClient]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        yield client
+
+
+async def run(args) -> None:
+    weights = parse_mix(args.mix)
+    names, scenario_weights = list(weights), list(weights.values())
+    users = [VirtualUser(username=f"bench_{uuid.uuid4().hex[:12]}", password="password123")
+             for _ in range(args.users)]
+    rec = Recorder()
+
+    client_cm = remote_client(args.url, args.concurrency) if args.url else in_process_client()
+    async with client_cm as client:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def limited(coro):
+            async with semaphore:
+                await coro
+
+        setup_started = time.perf_counter()
+        await asyncio.gather(*(limited(register(client, rec, user)) for user in users))
+        await asyncio.gather(*(limited(login(client, rec, user)) for user in users))
+        await asyncio.gather(*(limited(create(client, rec, user))
+                               for user in users for _ in range(args.tasks_per_user)))
+        setup, setup_elapsed = rec, time.perf_counter() - setup_started
+        rec = Recorder()
+
+        deadline = time.perf_counter() + args.duration
+        remaining = [args.requests] if args.requests else None
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                if remaining is not None:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                user = random.choice(users)
+                if not user.access_token:
+                    await login(client, rec, user)
+                    continue
+                scenario = random.choices(names, weights=scenario_weights)[0]
+                await SCENARIOS[scenario](client, rec, user)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"setup: {args.users} users, {args.tasks_per_user} tasks per user")
+    print(setup.report(setup_elapsed))
+    print()
+    print(f"run: concurrency={args.concurrency} mix={args.mix} elapsed={elapsed:.1f}s")
+    print(rec.report(elapsed))
+
+    if not args.url:
+        from app.hashing import PasswordHasher
+        from database.task_cache import TaskListCache
+        print()
+        print(f"password hasher: {PasswordHasher.stats()}")
+        print(f"task list cache: {TaskListCache.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="адрес запущенного сервера; без него приложение поднимается в процессе")
+    parser.add_argument("--concurrency", type=int, default=16, help="число одновременных запросов")
+    parser.add_argument("--users", type=int, default=10, help="число виртуальных пользователей")
+    parser.add_argument("--tasks-per-user", type=int, default=20, help="задач на пользователя при подготовке")
+    parser.add_argument("--duration", type=float, default=10, help="длительность прогона в секундах")
+    parser.add_argument("--requests", type=int, default=0, help="остановиться после N запросов (0 - по времени)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"веса сценариев, по умолчанию {DEFAULT_MIX}")
+    parser.add_argument("--seed", type=int, help="seed генератора случайных чисел")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
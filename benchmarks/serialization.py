@@ -0,0 +1,121 @@
+"""
+Сравнение способов получения и сериализации списка задач.
+
+- `orm+jsonable_encoder` - прежний путь: ORM-объекты -> TaskOut (from_attributes) -> jsonable_encoder -> json.dumps;
+- `orm+TypeAdapter` - ORM-объекты -> TaskOut -> TypeAdapter.dump_json;
+- `rows+dump_tasks` - строки колонками -> `app.serialization.dump_tasks` (orjson, если установлен).
+
+Выборка выполняется из SQLite в памяти, поэтому внешние сервисы не нужны.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.serialization --rows 10000 --repeat 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("URL_DB", "sqlite+aiosqlite:///:memory:")
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import serialization
+from app.pydantic_models import TaskOut
+from app.serialization import dump_tasks, task_list_adapter
+from database.mod import Base, Task, UserInDB
+
+
+async def orm_jsonable_encoder(session, user_id: int) -> bytes:
+    tasks = (await session.execute(select(Task).where(Task.user_id == user_id).order_by(Task.id))).scalars().all()
+    models = [TaskOut.model_validate(task) for task in tasks]
+    return json.dumps(jsonable_encoder(models)).encode()
+
+
+async def orm_type_adapter(session, user_id: int) -> bytes:
+    tasks = (await session.execute(select(Task).where(Task.user_id == user_id).order_by(Task.id))).scalars().all()
+    return task_list_adapter.dump_json([TaskOut.model_validate(task) for task in tasks])
+
+
+async def rows_dump_tasks(session, user_id: int) -> bytes:
+    return dump_tasks(await Task.get_tasks(session, user_id=user_id))
+
+
+async def measure(session_factory, func, user_id: int, repeat: int) -> float:
+    """Медиана полного времени (выборка + сериализация) в мс"""
+    totals = []
+    for _ in range(repeat):
+        async with session_factory() as session:
+            started = time.perf_counter()
+            await func(session, user_id)
+            totals.append(time.perf_counter() - started)
+    return statistics.median(totals) * 1000
+
+
+def serialize_only(repeat: int, rows: list[dict]) -> dict[str, float]:
+    """Время сериализации уже выбранных данных, без обращения к базе"""
+    objects = [Task(**row) for row in rows]
+    cases = {
+        "orm+jsonable_encoder": lambda: json.dumps(jsonable_encoder([TaskOut.model_validate(t) for t in objects])),
+        "orm+TypeAdapter": lambda: task_list_adapter.dump_json([TaskOut.model_validate(t) for t in objects]),
+        "rows+dump_tasks": lambda: dump_tasks(rows),
+    }
+    result = {}
+    for name, case in cases.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            case()
+            timings.append(time.perf_counter() - started)
+        result[name] = statistics.median(timings) * 1000
+    return result
+
+
+async def run(args) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with session_factory() as session:
+        user = await UserInDB.add(session, username="bench", hashed_password="-")
+        rows = [{"title": f"task {i}", "description": "описание задачи " * 4, "status": i % 3 == 0,
+                 "user_id": user.id} for i in range(args.rows)]
+        await session.execute(Task.__table__.insert(), rows)
+        await session.commit()
+        rows = [dict(row) for row in await Task.get_tasks(session, user_id=user.id)]
+
+    cases = {
+        "orm+jsonable_encoder": orm_jsonable_encoder,
+        "orm+TypeAdapter": orm_type_adapter,
+        "rows+dump_tasks": rows_dump_tasks,
+    }
+    bodies = {}
+    async with session_factory() as session:
+        for name, func in cases.items():
+            bodies[name] = json.loads(await func(session, user.id))
+    assert all(body == bodies["rows+dump_tasks"] for body in bodies.values()), "responses differ"
+
+    encoder = "orjson" if serialization.orjson is not None else "pydantic-core"
+    print(f"rows={args.rows} repeat={args.repeat} encoder={encoder}")
+    print(f"{'method':<24}{'fetch+dump ms':>16}{'dump ms':>12}")
+    dump_only = serialize_only(args.repeat, rows)
+    for name, func in cases.items():
+        total = await measure(session_factory, func, user.id, args.repeat)
+        print(f"{name:<24}{total:>16.2f}{dump_only[name]:>12.2f}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000, help="число задач в списке")
+    parser.add_argument("--repeat", type=int, default=10, help="число повторов, выводится медиана")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Время холодного старта процесса приложения по этапам.
+
+Каждый прогон выполняется в новом интерпретаторе: замеряется импорт модулей приложения (каждая строка -
+прирост относительно предыдущих модулей) и этапы `lifespan` из `app.state.startup_phases`. Режимы:
+
+- `full` - проверка схемы при старте (`DB_SCHEMA_CHECK_ON_STARTUP=true`, по умолчанию);
+- `fast` - без проверки схемы: миграции применяются на этапе развёртывания.
+
+По умолчанию используется временная SQLite-база, подготовленная миграциями, и fakeredis. Для замера
+на реальных сервисах укажите `--database-url` (база должна быть на последней миграции) и `--redis-url`.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+IMPORT_STEPS = ("config", "database.mod", "database.db", "app.handlers", "app.main")
+MODES = {
+    "full": {"DB_SCHEMA_CHECK_ON_STARTUP": "true"},
+    "fast": {"DB_SCHEMA_CHECK_ON_STARTUP": "false"},
+}
+
+
+async def measure_lifespan(use_fakeredis: bool) -> dict[str, float]:
+    from app.main import app
+
+    if use_fakeredis:
+        import fakeredis
+        import database.redis
+        database.redis.redis_instance = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    timings = {}
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings.update({f"lifespan {name}": value for name, value in app.state.startup_phases.items()})
+        stopping = time.perf_counter()
+    timings["lifespan total"] = stopping - started
+    timings["shutdown"] = time.perf_counter() - stopping
+    return timings
+
+
+def child(use_fakeredis: bool) -> None:
+    """Замер в текущем (новом) процессе; результат печатается одной JSON-строкой"""
+    timings = {}
+    started = time.perf_counter()
+    for module in IMPORT_STEPS:
+        step_started = time.perf_counter()
+        importlib.import_module(module)
+        timings[f"import {module}"] = time.perf_counter() - step_started
+    timings["import total"] = time.perf_counter() - started
+    timings.update(asyncio.run(measure_lifespan(use_fakeredis)))
+    print(json.dumps(timings))
+
+
+def migrate(database_url: str) -> None:
+    env = dict(os.environ, URL_DB=database_url)
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run_once(env: dict, use_fakeredis: bool) -> dict[str, float]:
+    command = [sys.executable, "-m", "benchmarks.startup", "--child"]
+    if use_fakeredis:
+        command.append("--fakeredis")
+    result = subprocess.run(command, env=env, check=True, capture_output=True, text=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="число запусков процесса на режим")
+    parser.add_argument("--database-url", help="URL_DB; без него используется временная SQLite-база")
+    parser.add_argument("--redis-url", help="REDIS_URL; без него используется fakeredis")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--fakeredis", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.fakeredis)
+        return
+
+    database_url = args.database_url
+    if database_url is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="task_manager_startup_"), "startup.db")
+        database_url = f"sqlite+aiosqlite:///{db_path}"
+        migrate(database_url)
+
+    env = dict(os.environ, URL_DB=database_url, URL_DB_REPLICAS="", DB_MIGRATE_ON_STARTUP="false")
+    if args.redis_url:
+        env["REDIS_URL"] = args.redis_url
+
+    results: dict[str, dict[str, float]] = {}
+    for mode, overrides in MODES.items():
+        runs = [run_once(dict(env, **overrides), use_fakeredis=not args.redis_url) for _ in range(args.runs)]
+        results[mode] = {phase: statistics.median(run.get(phase, 0.0) for run in runs) * 1000 for phase in runs[0]}
+
+    phases = list(dict.fromkeys(phase for timings in results.values() for phase in timings))
+    print(f"{'phase, ms (median of ' + str(args.runs) + ')':<36}" + "".join(f"{mode:>10}" for mode in results))
+    for phase in phases:
+        print(f"{phase:<36}" + "".join(f"{results[mode].get(phase, 0.0):>10.1f}" for mode in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 
 import os
+from typing import Literal, Optional
 
 from pydantic.v1 import BaseSettings
 
@@ -12,8 +13,85 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     URL: str
     REFRESH_TOKEN_EXPIRE_DAYS: int
-    REDIS_HOST: str
-    REDIS_PORT: int
+    # Устарели: адрес Redis задаётся в REDIS_URL. Оставлены необязательными, чтобы старые .env не ломали запуск
+    REDIS_HOST: Optional[str] = None
+    REDIS_PORT: Optional[int] = None
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 1.0
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    REDIS_CONNECT_TIMEOUT: float = 1.0
+    REDIS_RETRY_ATTEMPTS: int = 2
+    REDIS_RETRY_BACKOFF_BASE: float = 0.02
+    REDIS_RETRY_BACKOFF_CAP: float = 0.5
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 500
+    DB_MIGRATE_ON_STARTUP: bool = False
+    DB_SCHEMA_CHECK_ON_STARTUP: bool = True
+    DB_MIGRATION_BATCH_SIZE: int = 10000
+    DB_POOL_WARMUP_CONNECTIONS: int = 2
+    URL_DB_REPLICAS: str = ""
+    DB_REPLICA_STICKY_SECONDS: int = 10
+    TASKS_PAGE_DEFAULT_LIMIT: int = 100
+    TASKS_PAGE_MAX_LIMIT: int = 1000
+    TASKS_STREAM_BATCH_SIZE: int = 1000
+    TASKS_BATCH_MAX_SIZE: int = 5000
+    TASKS_IMPORT_CHUNK_SIZE: int = 5000
+    TASKS_IMPORT_MAX_LINE_BYTES: int = 1048576
+    TASKS_IMPORT_MAX_ERRORS: int = 100
+    TASK_SEARCH_CONFIG: str = "simple"
+    TASK_LIST_CACHE_ENABLED: bool = True
+    TASK_LIST_CACHE_TTL: int = 300
+    TASK_LIST_VERSION_TTL: int = 86400
+    TASK_LIST_ETAG_ENABLED: bool = True
+    TASK_EVENTS_ENABLED: bool = True
+    TASK_EVENTS_QUEUE_SIZE: int = 100
+    TASK_EVENTS_MAX_CONNECTIONS: int = 20000
+    TASK_EVENTS_PING_INTERVAL: float = 15
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOCAL_CACHE_SIZE: int = 100000
+    RATE_LIMIT_LOGIN_PER_IP: str = "30/minute"
+    RATE_LIMIT_LOGIN_PER_USERNAME: str = "10/minute"
+    RATE_LIMIT_REGISTER_PER_IP: str = "10/minute"
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_LOCAL_CACHE_TTL: int = 60
+    PRINCIPAL_CACHE_TTL: int = 3600
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 0
+    PASSWORD_REHASH_ON_LOGIN: bool = True
+    JWT_CACHE_ENABLED: bool = True
+    JWT_CACHE_SIZE: int = 10000
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROCESS_DIR: str = ""
+    METRICS_FLUSH_INTERVAL: float = 5
+    PROFILING_ENABLED: bool = False
+    PROFILING_HEADER_TOKEN: str = ""
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_SLOW_THRESHOLD_MS: int = 500
+    PROFILING_INTERVAL_MS: float = 1.0
+    PROFILING_MAX_CONCURRENT: int = 1
+    PROFILING_FORMAT: Literal["collapsed", "speedscope"] = "speedscope"
+    PROFILING_DIR: str = "profiles"
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 1
+    SERVER_LOOP: Literal["auto", "asyncio", "uvloop"] = "auto"
+    SERVER_HTTP: Literal["auto", "h11", "httptools"] = "auto"
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_TIMEOUT: int = 5
+    SERVER_LIMIT_CONCURRENCY: int = 0
+    SERVER_DRAIN_DELAY: float = 0
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    SERVER_ACCESS_LOG: bool = False
+    READINESS_TIMEOUT: float = 1.0
 
     class Config:
         env_file = os.path.join(os.path.dirname(__file__), '.env')
@@ -1,37 +1,124 @@
+import asyncio
+import itertools
+import os
+import time
 from typing import AsyncGenerator
 
-from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from database.mod import Base
+from loguru import logger
+from sqlalchemy import exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import config
 
 
-
-
 DATABASE_URL = config.URL_DB
 
 
-engine = create_async_engine(DATABASE_URL, future=True, echo=True)
-
-
-async_session = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=True,
-)
-
-# DATABASE_URL = "sqlite+aiosqlite:///./test.database"  # Используйте SQLite для простоты, замените на PostgreSQL в продакшене
-# engine = create_async_engine(DATABASE_URL)
-# async_session = async_sessionmaker(
-#     engine,
-#     class_=AsyncSession,
-#     expire_on_commit=False,
-#     autocommit=False,
-#     autoflush=True,
-# )
-# sync_engine = create_engine("sqlite:///./test.database")
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, учитывающий время получения соединения и таймауты.
+
+    Время считается от запроса соединения до его выдачи и включает ожидание свободного слота,
+    установку нового соединения и pre-ping.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.acquire_count = 0
+        self.acquire_time_total = 0.0
+        self.acquire_time_max = 0.0
+        self.timeouts = 0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.acquire_count += 1
+            self.acquire_time_total += elapsed
+            self.acquire_time_max = max(self.acquire_time_max, elapsed)
+
+
+def build_engine(url: str) -> AsyncEngine:
+    """
+    Создать асинхронный движок с настройками пула из `Settings`.
+
+    Для SQLite параметры пула не применяются: aiosqlite использует собственную стратегию соединений.
+    """
+    url = make_url(url)
+    options = {"future": True, "echo": config.DB_ECHO}
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedPool,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+            pool_pre_ping=config.DB_POOL_PRE_PING,
+        )
+    if url.get_driver_name() == "asyncpg":
+        url = url.update_query_dict({"prepared_statement_cache_size": str(config.DB_STATEMENT_CACHE_SIZE)})
+    return create_async_engine(url, **options)
+
+
+engine = build_engine(DATABASE_URL)
+
+
+def build_sessionmaker(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=True,
+    )
+
+
+async_session = build_sessionmaker(engine)
+
+# Реплики для чтения; без URL_DB_REPLICAS все запросы идут в основную базу
+replica_engines = [build_engine(url.strip()) for url in config.URL_DB_REPLICAS.split(",") if url.strip()]
+replica_sessions = [build_sessionmaker(replica) for replica in replica_engines]
+_replica_cycle = itertools.cycle(replica_sessions)
+
+
+def has_replicas() -> bool:
+    return bool(replica_sessions)
+
+
+def read_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """Фабрика сессий для чтения: следующая реплика по кругу или основная база, если реплик нет"""
+    return next(_replica_cycle) if replica_sessions else async_session
+
+
+def pool_stats(engine: AsyncEngine = engine) -> dict:
+    """
+    Состояние пула соединений движка.
+
+    **Возвращает**:
+    - `dict`: Размер пула, число выданных соединений и соединений сверх `pool_size`,
+      а также статистика времени получения соединения.
+    """
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedPool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "acquire_count": pool.acquire_count,
+        "acquire_time_total": pool.acquire_time_total,
+        "acquire_time_max": pool.acquire_time_max,
+        "timeouts": pool.timeouts,
+    }
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -45,10 +132,90 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         await session.close()
 
 
-# def init_db():
-#     Base.metadata.create_all(bind=async_session)
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Сессия для запросов только на чтение, допускающих отставание реплики"""
+    session: AsyncSession = read_sessionmaker()()
+    try:
+        yield session
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
 
 
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+    """
+    Проверить, что схема базы соответствует последней миграции.
+
+    Схема создаётся и изменяется миграциями (`alembic upgrade head`), которые выполняются до запуска
+    приложения. При `DB_MIGRATE_ON_STARTUP` миграции применяются при старте - это удобно для разработки,
+    но не для нескольких процессов, стартующих одновременно. При `DB_SCHEMA_CHECK_ON_STARTUP=false`
+    проверка пропускается: процесс не обращается к базе и не загружает alembic, что ускоряет запуск
+    воркеров, когда миграции гарантированно применены на этапе развёртывания.
+
+    **Ошибки**:
+    - RuntimeError: Если база отстаёт от миграций или опережает их.
+    """
+    if not (config.DB_MIGRATE_ON_STARTUP or config.DB_SCHEMA_CHECK_ON_STARTUP):
+        return
+
+    # alembic заметно увеличивает время импорта, поэтому загружается только здесь
+    from alembic import command
+    from alembic.config import Config as AlembicConfig
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    alembic_config = AlembicConfig(ALEMBIC_INI)
+    if config.DB_MIGRATE_ON_STARTUP:
+        # env.py запускает собственный event loop, поэтому миграции выполняются в отдельном потоке
+        await asyncio.to_thread(command.upgrade, alembic_config, "head")
+
+    async with engine.connect() as conn:
+        current = await conn.run_sync(lambda sync_conn: MigrationContext.configure(sync_conn).get_current_heads())
+    expected = ScriptDirectory.from_config(alembic_config).get_heads()
+    if set(current) != set(expected):
+        raise RuntimeError(f"Database schema is at revision {', '.join(current) or 'none'}, "
+                           f"expected {', '.join(expected)}: run `alembic upgrade head`")
+    logger.info(f"Database schema is at revision {', '.join(current)}")
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> int:
+    """
+    Открыть `connections` соединений одновременно и вернуть их в пул.
+
+    Соединения устанавливаются параллельно, поэтому прогрев стоит примерно одного подключения, а первые
+    запросы после старта не ждут установки соединений. Ошибки подключения не прерывают запуск.
+
+    **Возвращает**:
+    - `int`: Число успешно открытых соединений.
+    """
+    opened = [engine.connect() for _ in range(connections)]
+
+    async def check(connection) -> None:
+        await connection.start()
+        await connection.execute(text("SELECT 1"))
+
+    results = await asyncio.gather(*(check(connection) for connection in opened), return_exceptions=True)
+    await asyncio.gather(*(connection.close() for connection in opened), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        logger.warning(f"Database pool warm-up failed for {len(errors)} of {connections} connections: {errors[0]}")
+    return connections - len(errors)
+
+
+async def warm_up_pools() -> None:
+    """Прогреть пулы основной базы и реплик (`DB_POOL_WARMUP_CONNECTIONS`, но не больше `DB_POOL_SIZE`)"""
+    connections = min(config.DB_POOL_WARMUP_CONNECTIONS, config.DB_POOL_SIZE)
+    if connections <= 0:
+        return
+    await asyncio.gather(*(warm_up_pool(pool_engine, connections)
+                           for pool_engine in [engine, *replica_engines]))
+
+
+async def dispose_engines() -> None:
+    """Закрыть соединения пулов основной базы и реплик (вызывается при завершении приложения)"""
+    await asyncio.gather(*(pool_engine.dispose() for pool_engine in [engine, *replica_engines]))
@@ -1,9 +1,17 @@
+import re
+from collections import Counter
+from typing import AsyncIterator, Iterable, NamedTuple, Optional
+
+from sqlalchemy.engine import RowMapping
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import DDL, bindparam, delete, event, func, insert, select, text, update
 from sqlalchemy.ext.declarative import  declarative_base
 from sqlalchemy.orm import declared_attr, relationship
 from sqlalchemy import (
+    BigInteger,
     Column,
+    DateTime,
+    Index,
     Integer,
     ForeignKey,
     String,
@@ -11,10 +19,30 @@ from sqlalchemy import (
 )
 
 from app.pydantic_models import UserOut
+from config import config
 
 Base = declarative_base()
 
 
+class UserNotFoundError(LookupError):
+    """Пользователь, для которого выполняется запись задач, не найден (например, удалён после выдачи токена)"""
+
+    def __init__(self, user_id: int):
+        super().__init__(f"User {user_id} not found")
+        self.user_id = user_id
+
+
+class SearchTerm(NamedTuple):
+    """Условие поискового запроса: слово или фраза в кавычках"""
+    words: tuple[str, ...]
+    prefix: bool = False  # `слово*` - поиск по префиксу
+    negated: bool = False  # `-слово` - задача не должна содержать слово или фразу
+
+
+# Необязательный `-` и фраза в кавычках (закрывающая кавычка может отсутствовать) или слово до пробела
+SEARCH_TOKEN_RE = re.compile(r'(-?)(?:"([^"]*)"?|(\S+))')
+
+
 class BaseMixin(Base):
     __abstract__ = True  # Указываем, что это абстрактный класс, от него нельзя создавать таблицы
 
@@ -62,6 +90,140 @@ class BaseMixin(Base):
             return True
         return False
 
+    @classmethod
+    def _filters(cls, **filters):
+        """Условия WHERE вида `колонка == значение`, например `user_id=...` для проверки владельца"""
+        return [getattr(cls, key) == value for key, value in filters.items()]
+
+    @classmethod
+    async def update_returning(cls, session: AsyncSession, id: int, values: dict, commit: bool = True, **filters):
+        """Обновить запись одним UPDATE ... WHERE id = :id [AND ...] RETURNING *
+
+        Проверка условий (например, владельца записи) и запись выполняются одним запросом,
+        без предварительной загрузки экземпляра.
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            id (int): Идентификатор записи для обновления
+            values (dict): Новые значения колонок
+            commit (bool): Зафиксировать транзакцию после обновления
+            **filters: Дополнительные условия, например `user_id` владельца
+
+        Returns:
+            instance: Обновленный экземпляр модели, если запись найдена и прошла условия, иначе None
+        """
+        query = (
+            update(cls)
+            .where(cls.id == id, *cls._filters(**filters))
+            .values(**values)
+            .returning(cls)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.scalars(query)
+        instance = result.one_or_none()
+        if commit:
+            await session.commit()
+        return instance
+
+    @classmethod
+    async def delete_returning(cls, session: AsyncSession, id: int, commit: bool = True, **filters) -> Optional[int]:
+        """Удалить запись одним DELETE ... WHERE id = :id [AND ...] RETURNING id
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            id (int): Идентификатор записи для удаления
+            commit (bool): Зафиксировать транзакцию после удаления
+            **filters: Дополнительные условия, например `user_id` владельца
+
+        Returns:
+            int: Идентификатор удаленной записи, если она найдена и прошла условия, иначе None
+        """
+        query = (
+            delete(cls)
+            .where(cls.id == id, *cls._filters(**filters))
+            .returning(cls.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.scalars(query)
+        deleted = result.one_or_none()
+        if commit:
+            await session.commit()
+        return deleted
+
+    @classmethod
+    async def add_many(cls, session: AsyncSession, rows: list[dict], commit: bool = True) -> list:
+        """Добавить несколько записей одним многострочным INSERT ... RETURNING
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            rows (list[dict]): Данные для создания записей
+            commit (bool): Зафиксировать транзакцию после вставки
+
+        Returns:
+            list: Созданные экземпляры модели в порядке `rows`
+        """
+        if not rows:
+            return []
+        result = await session.scalars(insert(cls).returning(cls, sort_by_parameter_order=True), rows)
+        instances = result.all()
+        if commit:
+            await session.commit()
+        return instances
+
+    @classmethod
+    async def update_many(cls, session: AsyncSession, ids: Iterable[int], values: dict,
+                          commit: bool = True, **filters) -> list:
+        """Обновить записи с id из `ids` одним UPDATE ... RETURNING
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            ids (Iterable[int]): Идентификаторы записей
+            values (dict): Новые значения колонок
+            commit (bool): Зафиксировать транзакцию после обновления
+            **filters: Дополнительные условия, например `user_id` владельца
+
+        Returns:
+            list: Обновленные экземпляры модели; записи, не прошедшие условия, не возвращаются
+        """
+        query = (
+            update(cls)
+            .where(cls.id.in_(list(ids)), *cls._filters(**filters))
+            .values(**values)
+            .returning(cls)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.scalars(query)
+        instances = result.all()
+        if commit:
+            await session.commit()
+        return instances
+
+    @classmethod
+    async def delete_many(cls, session: AsyncSession, ids: Iterable[int], commit: bool = True,
+                          **filters) -> list[int]:
+        """Удалить записи с id из `ids` одним DELETE ... RETURNING id
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            ids (Iterable[int]): Идентификаторы записей
+            commit (bool): Зафиксировать транзакцию после удаления
+            **filters: Дополнительные условия, например `user_id` владельца
+
+        Returns:
+            list[int]: Идентификаторы удаленных записей
+        """
+        query = (
+            delete(cls)
+            .where(cls.id.in_(list(ids)), *cls._filters(**filters))
+            .returning(cls.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.scalars(query)
+        deleted = result.all()
+        if commit:
+            await session.commit()
+        return deleted
+
     @classmethod
     async def get_by_id(cls, session: AsyncSession, id: int):
         """Получить запись по id
@@ -112,9 +274,96 @@ class UserInDB(BaseMixin):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)
+    # Последняя выданная ревизия задач пользователя, см. Task.get_changes
+    task_revision = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # Счётчики неудалённых задач пользователя, меняются в транзакции каждой записи задач, см. GET /tasks/stats
+    task_count = Column(BigInteger, nullable=False, default=0, server_default="0")
+    task_completed_count = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     tasks = relationship("Task", back_populates="user")
 
+    @classmethod
+    async def next_task_revision(cls, session: AsyncSession, user_id: int, count: int = 1,
+                                 total_delta: int = 0, completed_delta: int = 0) -> int:
+        """Выделить `count` следующих ревизий задач пользователя
+
+        Счётчик увеличивается в текущей транзакции, строка пользователя остаётся заблокированной до её
+        завершения. Поэтому записи одного пользователя фиксируются строго в порядке ревизий, и клиент,
+        получивший изменения до ревизии N, не пропустит транзакцию с меньшим номером, зафиксированную позже.
+        Изменение счётчиков задач пользователя применяется тем же запросом.
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            user_id (int): Идентификатор пользователя
+            count (int): Количество ревизий
+            total_delta (int): Изменение числа задач
+            completed_delta (int): Изменение числа выполненных задач
+
+        Returns:
+            int: Последняя из выделенных ревизий
+
+        Raises:
+            UserNotFoundError: Если пользователя нет
+        """
+        result = await session.execute(
+            update(cls)
+            .where(cls.id == user_id)
+            .values(task_revision=cls.task_revision + count, **cls._task_count_values(total_delta, completed_delta))
+            .returning(cls.task_revision)
+        )
+        revision = result.scalar_one_or_none()
+        if revision is None:
+            raise UserNotFoundError(user_id)
+        return revision
+
+    @classmethod
+    def _task_count_values(cls, total_delta: int, completed_delta: int) -> dict:
+        values = {}
+        if total_delta:
+            values["task_count"] = cls.task_count + total_delta
+        if completed_delta:
+            values["task_completed_count"] = cls.task_completed_count + completed_delta
+        return values
+
+    @classmethod
+    async def get_task_counts(cls, session: AsyncSession, user_id: int) -> Optional[RowMapping]:
+        """Получить счётчики задач пользователя одним чтением строки по первичному ключу
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            user_id (int): Идентификатор пользователя
+
+        Returns:
+            RowMapping: Поля task_count и task_completed_count, если пользователь найден, иначе None
+        """
+        result = await session.execute(
+            select(cls.task_count, cls.task_completed_count).where(cls.id == user_id)
+        )
+        return result.mappings().one_or_none()
+
+    @classmethod
+    async def recount_tasks(cls, session: AsyncSession, user_id: Optional[int] = None, commit: bool = True) -> None:
+        """Пересчитать счётчики задач по таблице задач
+
+        Нужен для заполнения счётчиков у существующих пользователей и для периодической сверки.
+        Выполняет подсчёт по индексу задач пользователя, поэтому не предназначен для обработки запросов.
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            user_id (int, optional): Идентификатор пользователя. Если None, пересчитываются все пользователи
+            commit (bool): Зафиксировать транзакцию после пересчёта
+        """
+        alive = (Task.user_id == cls.id) & Task.deleted_at.is_(None)
+        query = update(cls).values(
+            task_count=select(func.count()).where(alive).scalar_subquery(),
+            task_completed_count=select(func.count()).where(alive, Task.status.is_(True)).scalar_subquery(),
+        )
+        if user_id is not None:
+            query = query.where(cls.id == user_id)
+        await session.execute(query)
+        if commit:
+            await session.commit()
+
     @classmethod
     async def get_user_by_username(cls, session: AsyncSession, username: str):
         """Получить пользователя по username
@@ -147,33 +396,465 @@ class UserInDB(BaseMixin):
 
 class Task(BaseMixin):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Индексы создаются миграциями (migrations/versions), здесь они описаны для create_all и autogenerate.
+        # Выборка задач пользователя с keyset-пагинацией по id, без фильтра и с фильтром по статусу;
+        # удалённые задачи (tombstones) в индексы не попадают
+        Index("ix_tasks_user_id_id", "user_id", "id",
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        Index("ix_tasks_user_id_status_id", "user_id", "status", "id",
+              postgresql_where=text("deleted_at IS NULL"), sqlite_where=text("deleted_at IS NULL")),
+        # Выборка изменений пользователя после ревизии клиента; служит и индексом внешнего ключа user_id
+        Index("ix_tasks_user_id_revision", "user_id", "revision"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     description = Column(String)
     status = Column(Boolean, default=False)
     user_id = Column(Integer, ForeignKey("users.id"))
+    revision = Column(BigInteger, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    deleted_at = Column(DateTime(timezone=True))
 
     user = relationship("UserInDB", back_populates="tasks")
 
+    # Изменения задач выполняются с условием на владельца (`user_id`): по нему выделяется ревизия
+    # и меняются счётчики задач пользователя (UserInDB.task_count, task_completed_count) в той же транзакции.
+    # Удаление мягкое - строка остаётся tombstone-записью с `deleted_at`, чтобы клиенты узнали о нём
+    # через get_changes. Все выборки и изменения ниже видят только неудалённые задачи.
+
+    @classmethod
+    def _filters(cls, **filters):
+        return super()._filters(**filters) + [cls.deleted_at.is_(None)]
+
+    @classmethod
+    async def add(cls, session: AsyncSession, **kwargs):
+        kwargs["revision"] = await UserInDB.next_task_revision(
+            session, kwargs["user_id"], total_delta=1, completed_delta=int(bool(kwargs.get("status"))),
+        )
+        return await super().add(session, **kwargs)
+
     @classmethod
-    async def get_tasks(cls, session: AsyncSession, user_id: int, status: bool = None):
+    async def add_many(cls, session: AsyncSession, rows: list[dict], commit: bool = True) -> list:
+        next_revision = {}
+        completed = Counter(row["user_id"] for row in rows if row.get("status"))
+        for user_id, count in Counter(row["user_id"] for row in rows).items():
+            last_revision = await UserInDB.next_task_revision(session, user_id, count, total_delta=count,
+                                                              completed_delta=completed[user_id])
+            next_revision[user_id] = last_revision - count + 1
+        revisioned = []
+        for row in rows:
+            revisioned.append(dict(row, revision=next_revision[row["user_id"]]))
+            next_revision[row["user_id"]] += 1
+        return await super().add_many(session, revisioned, commit=commit)
+
+    @classmethod
+    async def _lock_tasks(cls, session: AsyncSession, ids: Iterable[int], **filters) -> dict[int, bool]:
+        """Заблокировать до конца транзакции задачи `ids`, подходящие под условия, и вернуть их статусы
+
+        Изменения счётчиков считаются по значениям, прочитанным под блокировкой, поэтому параллельные
+        изменения одних и тех же задач не учитываются дважды. На PostgreSQL строки задач блокируются
+        `SELECT ... FOR UPDATE` в порядке id, строка пользователя - позже, при выделении ревизии.
+        SQLite не блокирует отдельные строки, поэтому блокировка записи берётся до чтения пустым UPDATE
+        строки пользователя.
+        """
+        connection = await session.connection()
+        if connection.dialect.name != "postgresql":
+            await session.execute(
+                update(UserInDB)
+                .where(UserInDB.id == filters["user_id"])
+                .values(task_revision=UserInDB.task_revision)
+            )
+        result = await session.execute(
+            select(cls.id, cls.status)
+            .where(cls.id.in_(list(ids)), *cls._filters(**filters))
+            .order_by(cls.id)
+            .with_for_update()
+        )
+        return {task_id: bool(status) for task_id, status in result}
+
+    @staticmethod
+    def _count_deltas(statuses: dict[int, bool], values: dict) -> tuple[int, int]:
+        """Изменение числа задач и числа выполненных задач от присвоения `values` задачам со статусами `statuses`"""
+        if "deleted_at" in values:
+            return -len(statuses), -sum(statuses.values())
+        if "status" in values:
+            return 0, sum(int(bool(values["status"])) - status for status in statuses.values())
+        return 0, 0
+
+    @classmethod
+    async def update_returning(cls, session: AsyncSession, id: int, values: dict, commit: bool = True, **filters):
+        # Пустое изменение не выделяет ревизию и ничего не пишет
+        if not values:
+            result = await session.scalars(select(cls).where(cls.id == id, *cls._filters(**filters)))
+            return result.one_or_none()
+        tasks = await cls.update_many(session, [id], values, commit=commit, **filters)
+        return tasks[0] if tasks else None
+
+    @classmethod
+    async def update_many(cls, session: AsyncSession, ids: Iterable[int], values: dict,
+                          commit: bool = True, **filters) -> list:
+        # Изменение несуществующих или чужих задач не выделяет ревизию и ничего не пишет
+        statuses = await cls._lock_tasks(session, ids, **filters)
+        if not statuses:
+            if commit:
+                await session.rollback()
+            return []
+        total_delta, completed_delta = cls._count_deltas(statuses, values)
+        revision = await UserInDB.next_task_revision(session, filters["user_id"], total_delta=total_delta,
+                                                     completed_delta=completed_delta)
+        return await super().update_many(session, list(statuses), dict(values, revision=revision),
+                                         commit=commit, **filters)
+
+    @classmethod
+    async def update_batch(cls, session: AsyncSession, items: list[dict], commit: bool = True, **filters) -> list:
+        """Обновить задачи разными значениями одним UPDATE ... FROM (VALUES ...) RETURNING
+
+        На весь пакет выделяется одна ревизия, счётчики пользователя меняются тем же запросом.
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            items (list[dict]): Изменения задач: `id` и новые title, description, status; отсутствующее
+                поле или None оставляет значение задачи без изменений
+            commit (bool): Зафиксировать транзакцию после обновления
+            **filters: Дополнительные условия, например `user_id` владельца
+
+        Returns:
+            list: Обновленные задачи; задачи, не прошедшие условия, не возвращаются
+        """
+        statuses = await cls._lock_tasks(session, [item["id"] for item in items], **filters)
+        items = [item for item in items if item["id"] in statuses]
+        if not items:
+            if commit:
+                await session.rollback()
+            return []
+        completed_delta = sum(int(bool(item["status"])) - statuses[item["id"]]
+                              for item in items if item.get("status") is not None)
+        revision = await UserInDB.next_task_revision(session, filters["user_id"], completed_delta=completed_delta)
+
+        # Столбцы VALUES называются column1, column2, ... и в PostgreSQL, и в SQLite
+        columns = {"id": Integer, "title": String, "description": String, "status": Boolean}
+        rows, params = [], []
+        for i, item in enumerate(items):
+            rows.append("(" + ", ".join(f":{name}_{i}" for name in columns) + ")")
+            params.extend(bindparam(f"{name}_{i}", item.get(name), type_=type_) for name, type_ in columns.items())
+        names = ", ".join(f"column{n} AS {name}" for n, name in enumerate(columns, 1))
+        batch = (
+            text(f"SELECT {names} FROM (VALUES {', '.join(rows)}) AS batch_values")
+            .bindparams(*params)
+            .columns(**columns)
+            .subquery("v")
+        )
+        query = (
+            update(cls)
+            .where(cls.id == batch.c.id, *cls._filters(**filters))
+            .values(
+                title=func.coalesce(batch.c.title, cls.title),
+                description=func.coalesce(batch.c.description, cls.description),
+                status=func.coalesce(batch.c.status, cls.status),
+                revision=revision,
+            )
+            .returning(cls)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.scalars(query)
+        tasks = result.all()
+        if commit:
+            await session.commit()
+        return tasks
+
+    @classmethod
+    async def delete_returning(cls, session: AsyncSession, id: int, commit: bool = True, **filters) -> Optional[int]:
+        task = await cls.update_returning(session, id, {"deleted_at": func.now()}, commit=commit, **filters)
+        return task.id if task is not None else None
+
+    @classmethod
+    async def delete_many(cls, session: AsyncSession, ids: Iterable[int], commit: bool = True,
+                          **filters) -> list[int]:
+        tasks = await cls.update_many(session, ids, {"deleted_at": func.now()}, commit=commit, **filters)
+        return [task.id for task in tasks]
+
+    @classmethod
+    async def update(cls, session: AsyncSession, id: int, **kwargs):
+        # Обновление без условия на владельца: владелец берётся из задачи, чтобы выделить ревизию и учесть счётчики
+        task = await cls.get_task_by_id(session, id)
+        if task is None:
+            return None
+        values = {key: value for key, value in kwargs.items() if value is not None}
+        return await cls.update_returning(session, id, values, user_id=task.user_id)
+
+    @classmethod
+    async def delete(cls, session: AsyncSession, id: int):
+        task = await cls.get_task_by_id(session, id)
+        if task is None:
+            return False
+        return await cls.delete_returning(session, id, user_id=task.user_id) is not None
+
+    @classmethod
+    async def load_many(cls, session: AsyncSession, user_id: int, rows: list[dict], commit: bool = True) -> int:
+        """Загрузить задачи пользователя без RETURNING и без создания ORM-объектов
+
+        На PostgreSQL с asyncpg строки передаются через `COPY ... FROM STDIN` в соединении текущей транзакции,
+        на остальных базах - одним `executemany` по Core-таблице. Ревизии выделяются на всю порцию сразу.
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            user_id (int): Идентификатор владельца задач
+            rows (list[dict]): Поля задач (title, description, status)
+            commit (bool): Зафиксировать транзакцию после загрузки
+
+        Returns:
+            int: Количество загруженных задач
+        """
+        if not rows:
+            return 0
+        completed = sum(1 for row in rows if row["status"])
+        last_revision = await UserInDB.next_task_revision(session, user_id, len(rows), total_delta=len(rows),
+                                                          completed_delta=completed)
+        first_revision = last_revision - len(rows) + 1
+        columns = ("title", "description", "status", "user_id", "revision")
+        records = [(row["title"], row["description"], row["status"], user_id, first_revision + i)
+                   for i, row in enumerate(rows)]
+
+        connection = await session.connection()
+        if connection.dialect.driver == "asyncpg":
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                cls.__tablename__, records=records, columns=columns,
+            )
+        else:
+            await session.execute(insert(cls.__table__), [dict(zip(columns, record)) for record in records])
+        if commit:
+            await session.commit()
+        return len(records)
+
+    @classmethod
+    def _tasks_query(cls, *columns, user_id: int, status: Optional[bool] = None, after: Optional[int] = None):
+        """Собрать запрос задач пользователя, упорядоченный по id для keyset-пагинации"""
+        query = select(*columns).where(cls.user_id == user_id, cls.deleted_at.is_(None))
+        if status is not None:
+            query = query.where(cls.status == status)
+        if after is not None:
+            query = query.where(cls.id > after)
+        return query.order_by(cls.id)
+
+    @classmethod
+    async def get_tasks(cls, session: AsyncSession, user_id: int, status: bool = None,
+                        limit: Optional[int] = None, after: Optional[int] = None):
         """Получить список задач для пользователя с опциональным фильтром по статусу
 
+        Выбираются только колонки, без ORM-объектов: строки сразу сериализуются в JSON.
+
         Args:
             session (AsyncSession): Сессия для работы с базой данных
             user_id (int): Идентификатор пользователя
             status (bool, optional): Статус задачи (True - выполнена, False - не выполнена). Если None, фильтр не применяется
+            limit (int, optional): Максимальное количество задач на странице. Если None, возвращаются все задачи
+            after (int, optional): Курсор - id последней задачи предыдущей страницы
 
         Returns:
-            list: Список задач пользователя
+            list[RowMapping]: Строки задач пользователя (id, title, description, status, user_id), упорядоченные по id
         """
-        query = select(cls).where(cls.user_id == user_id)
-        if status is not None:
-            query = query.where(cls.status == status)
+        query = cls._tasks_query(
+            cls.id, cls.title, cls.description, cls.status, cls.user_id,
+            user_id=user_id, status=status, after=after,
+        )
+        if limit is not None:
+            query = query.limit(limit)
         result = await session.execute(query)
+        return result.mappings().all()
+
+    @classmethod
+    async def stream_tasks(cls, session: AsyncSession, user_id: int, status: bool = None,
+                           after: Optional[int] = None, batch_size: int = 1000) -> AsyncIterator[RowMapping]:
+        """Потоково отдать задачи пользователя через серверный курсор
+
+        Строки выбираются колонками, без ORM-объектов, и читаются из курсора порциями
+        по `batch_size`, поэтому потребление памяти не зависит от числа задач.
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            user_id (int): Идентификатор пользователя
+            status (bool, optional): Фильтр по статусу задачи
+            after (int, optional): Курсор - id задачи, после которой начинать выдачу
+            batch_size (int): Количество строк, забираемых из курсора за один раз
+
+        Yields:
+            RowMapping: Строка задачи с полями id, title, description, status, user_id
+        """
+        query = cls._tasks_query(
+            cls.id, cls.title, cls.description, cls.status, cls.user_id,
+            user_id=user_id, status=status, after=after,
+        ).execution_options(yield_per=batch_size)
+        result = await session.stream(query)
+        async for row in result.mappings():
+            yield row
+
+    @classmethod
+    async def get_tasks_by_ids(cls, session: AsyncSession, ids: Iterable[int], user_id: int):
+        """Получить задачи пользователя по списку id
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            ids (Iterable[int]): Идентификаторы задач
+            user_id (int): Идентификатор владельца задач
+
+        Returns:
+            list: Найденные задачи пользователя
+        """
+        result = await session.execute(
+            select(cls).where(cls.id.in_(list(ids)), cls.user_id == user_id, cls.deleted_at.is_(None))
+        )
         return result.scalars().all()
 
+    @classmethod
+    async def get_changes(cls, session: AsyncSession, user_id: int, since: int, limit: int) -> tuple[list, bool]:
+        """Получить задачи пользователя, изменённые после ревизии `since`
+
+        Запросы идут по индексу (user_id, revision), поэтому стоимость зависит от числа изменений,
+        а не от размера списка. Задачи одной ревизии (пакетное изменение) не разделяются между страницами,
+        так что страница может быть немного больше `limit`.
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            user_id (int): Идентификатор пользователя
+            since (int): Последняя ревизия, известная клиенту
+            limit (int): Размер страницы
+
+        Returns:
+            tuple[list[RowMapping], bool]: Изменённые и удалённые задачи в порядке ревизий
+            и признак того, что есть ещё изменения
+        """
+        changed = (cls.user_id == user_id, cls.revision > since)
+        boundary = (await session.scalars(
+            select(cls.revision).where(*changed).order_by(cls.revision).offset(limit - 1).limit(2)
+        )).all()
+
+        query = select(
+            cls.id, cls.title, cls.description, cls.status, cls.user_id,
+            cls.revision, cls.created_at, cls.updated_at, cls.deleted_at,
+        ).where(*changed)
+        has_more = False
+        if boundary:
+            query = query.where(cls.revision <= boundary[0])
+            if len(boundary) == 2:
+                has_more = boundary[1] > boundary[0] or await session.scalar(
+                    select(select(cls.id).where(*changed, cls.revision > boundary[0]).exists())
+                )
+        result = await session.execute(query.order_by(cls.revision, cls.id))
+        return result.mappings().all(), has_more
+
+    @staticmethod
+    def _search_terms(query: str) -> list[list[SearchTerm]]:
+        """Разобрать поисковый запрос в группы условий
+
+        Условия группы объединяются через AND, группы разделяются словом `or` и объединяются через OR.
+        Поддерживаются фразы в кавычках, префиксы (`слово*`) и исключения (`-слово`, `-"фраза"`).
+        Слова без букв и цифр отбрасываются; группы без условий, кроме исключений, тоже отбрасываются.
+        Из результата строится запрос и для PostgreSQL, и для SQLite, поэтому синтаксис на обеих базах одинаков.
+        """
+        groups, group = [], []
+        for negated, quoted, word in SEARCH_TOKEN_RE.findall(query):
+            if word and not negated and word.lower() == "or":
+                groups.append(group)
+                group = []
+                continue
+            prefix = word.endswith("*")
+            words = tuple(w for w in ((word.rstrip("*"),) if word else quoted.split())
+                          if any(char.isalnum() for char in w))
+            if words:
+                group.append(SearchTerm(words, prefix, bool(negated)))
+        groups.append(group)
+        return [group for group in groups if any(not term.negated for term in group)]
+
+    @staticmethod
+    def _tsquery(groups: list[list[SearchTerm]]) -> str:
+        """Запрос для `to_tsquery`: слова в кавычках, фразы через `<->`, префиксы с `:*`, исключения с `!`"""
+        def term_query(term: SearchTerm) -> str:
+            query = " <-> ".join("'" + word.replace("\\", "\\\\").replace("'", "''") + "'" for word in term.words)
+            if len(term.words) > 1:
+                query = f"({query})"
+            elif term.prefix:
+                query += ":*"
+            return "!" + query if term.negated else query
+
+        return " | ".join("(" + " & ".join(term_query(term) for term in group) + ")" for group in groups)
+
+    @staticmethod
+    def _fts5_query(groups: list[list[SearchTerm]]) -> str:
+        """Запрос для FTS5 MATCH: слова и фразы в кавычках, префиксы с `*`, исключения через NOT"""
+        def phrase(term: SearchTerm) -> str:
+            return '"' + " ".join(term.words).replace('"', '""') + '"' + ("*" if term.prefix else "")
+
+        queries = []
+        for group in groups:
+            query = " AND ".join(phrase(term) for term in group if not term.negated)
+            negated = [phrase(term) for term in group if term.negated]
+            if negated:
+                query = f"({query}) NOT ({' OR '.join(negated)})"
+            queries.append(f"({query})")
+        return " OR ".join(queries)
+
+    @classmethod
+    async def search(cls, session: AsyncSession, user_id: int, query: str, limit: int = 20, offset: int = 0):
+        """Полнотекстовый поиск по названию и описанию задач пользователя
+
+        На PostgreSQL используется generated-колонка `search_vector` с GIN-индексом, на SQLite - FTS5-таблица
+        `tasks_fts`. Результаты упорядочены по релевантности, совпадения выделены тегами `<mark>`.
+        Синтаксис запроса описан в `_search_terms`. Запрос без условий не выполняется.
+
+        Args:
+            session (AsyncSession): Сессия для работы с базой данных
+            user_id (int): Идентификатор пользователя
+            query (str): Поисковый запрос
+            limit (int): Размер страницы
+            offset (int): Смещение от начала выдачи
+
+        Returns:
+            list[RowMapping]: Задачи с полями rank, title_highlight и description_highlight
+        """
+        groups = cls._search_terms(query)
+        if not groups:
+            return []
+
+        params = {"user_id": user_id, "limit": limit, "offset": offset}
+        if session.get_bind().dialect.name == "postgresql":
+            # ts_headline дорогой, поэтому считается только для строк текущей страницы
+            statement = text("""
+                SELECT page.*,
+                       ts_headline(CAST(:config AS regconfig), coalesce(page.title, ''), q,
+                                   'StartSel=<mark>, StopSel=</mark>, HighlightAll=true') AS title_highlight,
+                       ts_headline(CAST(:config AS regconfig), coalesce(page.description, ''), q,
+                                   'StartSel=<mark>, StopSel=</mark>, MaxFragments=2') AS description_highlight
+                FROM (
+                    SELECT tasks.id, tasks.title, tasks.description, tasks.status, tasks.user_id,
+                           ts_rank(tasks.search_vector, q) AS rank
+                    FROM tasks, to_tsquery(CAST(:config AS regconfig), :query) AS q
+                    WHERE tasks.user_id = :user_id AND tasks.deleted_at IS NULL AND tasks.search_vector @@ q
+                    ORDER BY rank DESC, tasks.id
+                    LIMIT :limit OFFSET :offset
+                ) AS page, to_tsquery(CAST(:config AS regconfig), :query) AS q
+                ORDER BY page.rank DESC, page.id
+            """)
+            params["config"] = config.TASK_SEARCH_CONFIG
+            params["query"] = cls._tsquery(groups)
+        else:
+            statement = text("""
+                SELECT tasks.id, tasks.title, tasks.description, tasks.status, tasks.user_id,
+                       -bm25(tasks_fts) AS rank,
+                       highlight(tasks_fts, 0, '<mark>', '</mark>') AS title_highlight,
+                       snippet(tasks_fts, 1, '<mark>', '</mark>', '…', 16) AS description_highlight
+                FROM tasks_fts JOIN tasks ON tasks.id = tasks_fts.rowid
+                WHERE tasks_fts MATCH :query AND tasks.user_id = :user_id AND tasks.deleted_at IS NULL
+                ORDER BY rank DESC, tasks.id
+                LIMIT :limit OFFSET :offset
+            """)
+            params["query"] = cls._fts5_query(groups)
+        result = await session.execute(statement, params)
+        return result.mappings().all()
+
     @staticmethod
     async def get_task_by_id(session: AsyncSession, task_id: int):
         """Получить задачу по id
@@ -185,6 +866,30 @@ class Task(BaseMixin):
                 Returns:
                     task: Задача с данным id, если найдена
                 """
-        result = await session.execute(select(Task).filter(Task.id == task_id))
+        result = await session.execute(select(Task).filter(Task.id == task_id, Task.deleted_at.is_(None)))
         return result.scalar()
 
+
+# Полнотекстовый поиск: generated tsvector + GIN на PostgreSQL, внешняя FTS5-таблица с триггерами на SQLite.
+# Схему рабочей базы создают миграции; DDL ниже нужен только для create_all (бенчмарки, временные базы).
+event.listen(Task.__table__, "after_create", DDL(
+    "ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    f"to_tsvector('{config.TASK_SEARCH_CONFIG}'::regconfig, "
+    "coalesce(title, '') || ' ' || coalesce(description, ''))) STORED"
+).execute_if(dialect="postgresql"))
+event.listen(Task.__table__, "after_create", DDL(
+    "CREATE INDEX ix_tasks_search_vector ON tasks USING GIN (search_vector)"
+).execute_if(dialect="postgresql"))
+
+for _statement in (
+    "CREATE VIRTUAL TABLE tasks_fts USING fts5(title, description, content='tasks', content_rowid='id')",
+    "CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+):
+    event.listen(Task.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
@@ -1,9 +1,144 @@
+import time
+from typing import Optional
+from urllib.parse import unquote, urlparse
+
 import redis.asyncio as redis
+from loguru import logger
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.connection import BlockingConnectionPool
+from redis.asyncio.retry import Retry
+from redis.asyncio.sentinel import Sentinel, SentinelConnectionPool
+from redis.backoff import EqualJitterBackoff
+from redis.exceptions import ConnectionError, RedisError, TimeoutError
+from app.metrics import observe_redis
 from config import config
-from datetime import timedelta
 
 
+class InstrumentedPipeline(Pipeline):
+    """Pipeline, учитывающий время выполнения пакета команд"""
+
+    async def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            observe_redis("PIPELINE", time.perf_counter() - started)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Клиент Redis, учитывающий время каждой команды в метриках"""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            observe_redis(str(args[0]).upper(), time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class PoolStatsMixin:
+    """Учёт ожидания соединений пула: число выдач, суммарное и максимальное время ожидания, отказы"""
+
+    acquire_count = 0
+    acquire_time_total = 0.0
+    acquire_time_max = 0.0
+    acquire_errors = 0
+
+    async def get_connection(self, command_name, *keys, **options):
+        started = time.perf_counter()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        except ConnectionError:
+            self.acquire_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.acquire_count += 1
+            self.acquire_time_total += elapsed
+            self.acquire_time_max = max(self.acquire_time_max, elapsed)
+
+
+class InstrumentedConnectionPool(PoolStatsMixin, BlockingConnectionPool):
+    """
+    Пул с ограничением `REDIS_MAX_CONNECTIONS`.
+
+    Когда все соединения заняты, запрос ждёт свободное не дольше `REDIS_POOL_TIMEOUT` и получает
+    ConnectionError, вместо того чтобы открывать новые соединения без ограничения.
+    """
+
+
+class InstrumentedSentinelPool(PoolStatsMixin, SentinelConnectionPool):
+    """Пул соединений с текущим master, адрес которого запрашивается у Sentinel"""
+
+
+def _connection_options() -> dict:
+    """
+    Таймауты и повторы с экспоненциальной задержкой для всех соединений пула.
+
+    `health_check_interval` не используется: в redis-py 5.x проверка соединения, упавшего сразу после
+    подключения, зацикливается. Мёртвые соединения обнаруживаются через TCP keepalive и повтор команды,
+    доступность Redis проверяет `ping_redis`.
+    """
+    return {
+        "max_connections": config.REDIS_MAX_CONNECTIONS,
+        "socket_timeout": config.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": config.REDIS_CONNECT_TIMEOUT,
+        "socket_keepalive": True,
+        "retry": Retry(
+            EqualJitterBackoff(cap=config.REDIS_RETRY_BACKOFF_CAP, base=config.REDIS_RETRY_BACKOFF_BASE),
+            config.REDIS_RETRY_ATTEMPTS,
+        ),
+        "retry_on_error": [ConnectionError, TimeoutError],
+        "encoding": "utf-8",
+        "decode_responses": True,
+    }
+
+
+def _sentinel_client(url: str) -> Redis:
+    """
+    Клиент для адреса вида `redis+sentinel://[:password@]host1:26379,host2:26379/service_name[/db]`.
+
+    Пароль из адреса используется для подключения к master, сами Sentinel опрашиваются без пароля.
+    """
+    parsed = urlparse(url)
+    hosts = parsed.netloc.rpartition("@")[2]
+    sentinels = []
+    for host in hosts.split(","):
+        name, _, port = host.partition(":")
+        sentinels.append((name, int(port or 26379)))
+    service_name, _, db = parsed.path.strip("/").partition("/")
+
+    options = _connection_options()
+    sentinel = Sentinel(sentinels, socket_timeout=options["socket_timeout"],
+                        socket_connect_timeout=options["socket_connect_timeout"])
+    return sentinel.master_for(
+        service_name,
+        redis_class=InstrumentedRedis,
+        connection_pool_class=InstrumentedSentinelPool,
+        password=unquote(parsed.password) if parsed.password else None,
+        db=int(db or 0),
+        **options,
+    )
+
+
+def create_redis(url: Optional[str] = None) -> Redis:
+    """
+    Создать клиент Redis по `REDIS_URL`.
+
+    Поддерживаются схемы `redis://`, `rediss://`, `unix://` и `redis+sentinel://`. Redis Cluster не
+    поддерживается: приложение использует pub/sub и транзакционные pipeline, которые в кластерном клиенте
+    работают иначе; для отказоустойчивости используется Sentinel.
+    """
+    url = url or config.REDIS_URL
+    if url.startswith("redis+sentinel://"):
+        return _sentinel_client(url)
+    pool = InstrumentedConnectionPool.from_url(url, timeout=config.REDIS_POOL_TIMEOUT, **_connection_options())
+    return InstrumentedRedis.from_pool(pool)
+
 
 redis_instance: Redis = None
 
@@ -11,46 +146,47 @@ async def get_redis() -> Redis:
     """Возвращает глобальный экземпляр Redis, если он инициализирован"""
     global redis_instance
     if not redis_instance:
-        redis_instance = redis.Redis(
-            host=config.REDIS_HOST,
-            port=config.REDIS_PORT,
-            db=0,
-            encoding="utf-8",
-            decode_responses=True
-        )
+        redis_instance = create_redis()
     return redis_instance
 
 async def init_redis():
-    """Инициализирует подключение к Redis"""
+    """Инициализирует подключение к Redis и проверяет его доступность"""
     global redis_instance
     if not redis_instance:
-        redis_instance = redis.Redis(
-            host=config.REDIS_HOST,
-            port=config.REDIS_PORT,
-            db=0,
-            encoding="utf-8",
-            decode_responses=True
-        )
+        redis_instance = create_redis()
+    if not await ping_redis():
+        logger.warning("Redis is unavailable at startup, caches and token store will fail until it recovers")
+
+async def ping_redis() -> bool:
+    """Проверка доступности Redis"""
+    try:
+        redis_conn = await get_redis()
+        return bool(await redis_conn.ping())
+    except RedisError as e:
+        logger.warning(f"Redis ping failed: {e}")
+        return False
 
 async def close_redis():
     """Закрывает подключение к Redis"""
     global redis_instance
     if redis_instance:
-        await redis_instance.close()
+        await redis_instance.aclose()
         redis_instance = None
 
-async def save_refresh_token_in_redis(username: str, refresh_token: str, expires_in: timedelta):
-    """Сохраняем refresh токен в Redis с истечением срока действия"""
-    redis_conn = await get_redis()
-    ttl = expires_in.total_seconds()  # Время жизни токена в секундах
-    await redis_conn.setex(f"refresh_token:{username}", ttl, refresh_token)
-
-async def get_refresh_token_from_redis(username: str):
-    """Получаем refresh токен из Redis"""
-    redis_conn = await get_redis()
-    return await redis_conn.get(f"refresh_token:{username}")
-
-async def delete_refresh_token_from_redis(username: str):
-    """Удаляем refresh токен из Redis"""
-    redis_conn = await get_redis()
-    await redis_conn.delete(f"refresh_token:{username}")
+def redis_pool_stats() -> dict:
+    """Состояние пула соединений Redis для метрик"""
+    pool = getattr(redis_instance, "connection_pool", None)
+    if pool is None:
+        return {}
+    in_use = len(getattr(pool, "_in_use_connections", ()))
+    available = len(getattr(pool, "_available_connections", ()))
+    return {
+        "max_connections": pool.max_connections,
+        "in_use": in_use,
+        "idle": available,
+        "utilization": in_use / pool.max_connections if pool.max_connections else 0.0,
+        "acquire_count": getattr(pool, "acquire_count", 0),
+        "acquire_time_total": getattr(pool, "acquire_time_total", 0.0),
+        "acquire_time_max": getattr(pool, "acquire_time_max", 0.0),
+        "acquire_errors": getattr(pool, "acquire_errors", 0),
+    }
@@ -0,0 +1,72 @@
+import uuid
+from datetime import timedelta
+from enum import Enum
+
+from database.redis import get_redis
+
+# KEYS[1] - семейство токенов; ARGV[1] - предъявленный jti, ARGV[2] - новый jti, ARGV[3] - TTL в секундах
+ROTATE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'jti')
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return -1
+end
+redis.call('HSET', KEYS[1], 'jti', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class RotationResult(Enum):
+    ROTATED = 1
+    UNKNOWN = 0  # Семейство не найдено: истекло, отозвано или токен выпущен до появления хранилища
+    REUSED = -1  # Предъявлен уже использованный токен, семейство отозвано
+
+
+class RefreshTokenStore:
+    """
+    Хранилище семейств refresh-токенов в Redis.
+
+    Каждый вход (устройство) открывает своё семейство `refresh:{family_id}`, в котором хранится jti
+    единственного действующего токена. При обновлении токен проверяется и заменяется новым одним Lua-скриптом,
+    то есть атомарно и за один запрос к Redis. Повторное предъявление уже заменённого токена означает,
+    что он утёк: семейство отзывается целиком, и устройству нужно войти заново. Остальные устройства
+    пользователя при этом не затрагиваются.
+    """
+
+    _rotate_script = None
+
+    @staticmethod
+    def _family_key(family_id: str) -> str:
+        return f"refresh:{family_id}"
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    @classmethod
+    async def create_family(cls, user_id: int, token_id: str, expires_in: timedelta) -> str:
+        """Открыть семейство для нового входа и вернуть его идентификатор"""
+        family_id = cls.new_id()
+        redis_conn = await get_redis()
+        async with redis_conn.pipeline(transaction=True) as pipe:
+            pipe.hset(cls._family_key(family_id), mapping={"jti": token_id, "uid": user_id})
+            pipe.expire(cls._family_key(family_id), expires_in)
+            await pipe.execute()
+        return family_id
+
+    @classmethod
+    async def rotate(cls, family_id: str, token_id: str, new_token_id: str, expires_in: timedelta) -> RotationResult:
+        """Заменить действующий токен семейства `token_id` на `new_token_id` и продлить срок жизни семейства"""
+        redis_conn = await get_redis()
+        if cls._rotate_script is None:
+            cls._rotate_script = redis_conn.register_script(ROTATE_SCRIPT)
+        result = await cls._rotate_script(
+            keys=[cls._family_key(family_id)],
+            args=[token_id, new_token_id, int(expires_in.total_seconds())],
+            client=redis_conn,
+        )
+        return RotationResult(int(result))
@@ -0,0 +1,62 @@
+from typing import Optional
+
+from loguru import logger
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import config
+from database.db import async_session, has_replicas, read_sessionmaker
+from database.mod import UserInDB
+from database.redis import get_redis
+
+
+class ReadRouting:
+    """
+    Маршрутизация чтения между основной базой и репликами.
+
+    После записи пользователь на `DB_REPLICA_STICKY_SECONDS` закрепляется за основной базой, чтобы
+    видеть собственные изменения независимо от отставания реплик. Метка хранится в Redis и общая для
+    всех воркеров. Без настроенных реплик обращений к Redis нет.
+    """
+
+    @staticmethod
+    def _sticky_key(user_id: int) -> str:
+        return f"db:primary:{user_id}"
+
+    @classmethod
+    async def mark_written(cls, user_id: int) -> None:
+        """Закрепить чтение пользователя за основной базой после записи"""
+        if not has_replicas():
+            return
+        try:
+            redis_conn = await get_redis()
+            await redis_conn.set(cls._sticky_key(user_id), 1, ex=config.DB_REPLICA_STICKY_SECONDS)
+        except RedisError as e:
+            logger.warning(f"Read routing mark failed for user {user_id}: {e}")
+
+    @classmethod
+    async def sessionmaker_for(cls, user_id: int) -> async_sessionmaker[AsyncSession]:
+        """Фабрика сессий для чтения данных пользователя"""
+        if not has_replicas():
+            return async_session
+        try:
+            redis_conn = await get_redis()
+            if await redis_conn.exists(cls._sticky_key(user_id)):
+                return async_session
+        except RedisError as e:
+            logger.warning(f"Read routing check failed for user {user_id}, using primary: {e}")
+            return async_session
+        return read_sessionmaker()
+
+
+async def get_user_by_username(session: AsyncSession, username: str) -> Optional[UserInDB]:
+    """
+    Найти пользователя в сессии чтения, при промахе повторить запрос в основной базе.
+
+    Повтор нужен для только что зарегистрированных пользователей, которые ещё не доехали до реплики.
+    """
+    user = await UserInDB.get_user_by_username(session, username)
+    if user is None and has_replicas():
+        async with async_session() as primary:
+            user = await UserInDB.get_user_by_username(primary, username)
+    return user
@@ -0,0 +1,117 @@
+import uuid
+from typing import Optional
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from app.cache import LRUCache
+from config import config
+from database.redis import get_redis
+
+
+class TaskListCache:
+    """
+    Read-through кэш сериализованных списков задач в Redis.
+
+    Для каждого пользователя хранится ключ версии `tasks:{user_id}:version`. Списки кэшируются под ключом,
+    включающим текущую версию и параметры запроса. Любая запись меняет версию на новое уникальное значение,
+    поэтому после собственной записи пользователь читает уже другой ключ, а старые списки истекают по TTL.
+    Версия - случайный токен, а не счётчик, чтобы после вытеснения ключа версии не переиспользовать старые значения.
+
+    Если сменить версию после записи не удалось, пользователь запоминается в `pending_bumps`: до успешной смены
+    версии процесс не отдаёт ему ни кэшированные списки, ни ETag, а каждое чтение повторяет смену версии.
+    """
+
+    hits = 0
+    misses = 0
+    errors = 0
+    bypassed = 0
+    pending_bumps = LRUCache(maxsize=100000, ttl=config.TASK_LIST_VERSION_TTL)
+
+    @staticmethod
+    def _version_key(user_id: int) -> str:
+        return f"tasks:{user_id}:version"
+
+    @staticmethod
+    def _list_key(user_id: int, version: str, params: tuple) -> str:
+        return f"tasks:{user_id}:{version}:" + ":".join("" if p is None else str(p) for p in params)
+
+    @classmethod
+    async def get_version(cls, user_id: int) -> Optional[str]:
+        """Текущая версия списка задач пользователя; создаётся при первом обращении"""
+        if cls.pending_bumps.get(user_id) is not None and not await cls.bump_version(user_id):
+            cls.bypassed += 1
+            return None
+        try:
+            redis_conn = await get_redis()
+            key = cls._version_key(user_id)
+            version = await redis_conn.get(key)
+            if version is None:
+                version = uuid.uuid4().hex
+                if not await redis_conn.set(key, version, nx=True, ex=config.TASK_LIST_VERSION_TTL):
+                    version = await redis_conn.get(key)
+            return version
+        except RedisError as e:
+            cls.errors += 1
+            logger.warning(f"Task list cache unavailable: {e}")
+            return None
+
+    @classmethod
+    async def bump_version(cls, user_id: int) -> bool:
+        """
+        Сменить версию после записи, сделав недоступными все закэшированные списки пользователя.
+
+        **Возвращает**:
+        - `bool`: True, если версия сменена; иначе кэш для пользователя обходится до следующей успешной смены.
+        """
+        try:
+            redis_conn = await get_redis()
+            await redis_conn.set(cls._version_key(user_id), uuid.uuid4().hex, ex=config.TASK_LIST_VERSION_TTL)
+        except RedisError as e:
+            cls.errors += 1
+            cls.pending_bumps.set(user_id, True)
+            logger.warning(f"Task list cache version bump failed for user {user_id}, bypassing the cache: {e}")
+            return False
+        cls.pending_bumps.pop(user_id)
+        return True
+
+    @classmethod
+    async def get(cls, user_id: int, version: str, params: tuple) -> Optional[tuple[str, Optional[str]]]:
+        """
+        Получить закэшированный список.
+
+        **Возвращает**:
+        - `tuple[str, Optional[str]]`: JSON-тело ответа и курсор следующей страницы.
+        - `None`: При промахе или недоступности Redis.
+        """
+        try:
+            redis_conn = await get_redis()
+            cached = await redis_conn.hgetall(cls._list_key(user_id, version, params))
+        except RedisError as e:
+            cls.errors += 1
+            logger.warning(f"Task list cache unavailable: {e}")
+            return None
+        if not cached:
+            cls.misses += 1
+            return None
+        cls.hits += 1
+        return cached["body"], cached.get("cursor") or None
+
+    @classmethod
+    async def set(cls, user_id: int, version: str, params: tuple, body: str, cursor: Optional[str]) -> None:
+        """Сохранить сериализованный список под текущей версией"""
+        key = cls._list_key(user_id, version, params)
+        try:
+            redis_conn = await get_redis()
+            async with redis_conn.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping={"body": body, "cursor": cursor or ""})
+                pipe.expire(key, config.TASK_LIST_CACHE_TTL)
+                await pipe.execute()
+        except RedisError as e:
+            cls.errors += 1
+            logger.warning(f"Task list cache store failed: {e}")
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {"enabled": config.TASK_LIST_CACHE_ENABLED, "hits": cls.hits, "misses": cls.misses,
+                "errors": cls.errors, "bypassed": cls.bypassed, "pending_bumps": len(cls.pending_bumps)}
@@ -0,0 +1,59 @@
+import asyncio
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import config
+from database.mod import Base
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    """Не сравнивать с моделями объекты полнотекстового поиска, которые создаются DDL в миграциях"""
+    if type_ == "table" and name.startswith("tasks_fts"):
+        return False
+    if type_ == "column" and name == "search_vector":
+        return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Вывести SQL миграций без подключения к базе (`alembic upgrade head --sql`)"""
+    context.configure(
+        url=config.URL_DB,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    # SQLite не умеет большинство ALTER TABLE: изменения таблиц выполняются через пересоздание (batch)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        render_as_batch=connection.dialect.name == "sqlite",
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online() -> None:
+    engine = create_async_engine(config.URL_DB, poolclass=pool.NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
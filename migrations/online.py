@@ -0,0 +1,63 @@
+"""
+Изменение схемы без долгих блокировок таблиц, общие шаги миграций.
+
+Заполнение новых колонок выполняется порциями по диапазонам id, каждая порция фиксируется отдельной транзакцией,
+поэтому блокируются только строки текущей порции и только на время её обновления. Ограничение NOT NULL
+добавляется после заполнения: на PostgreSQL через проверочное ограничение `NOT VALID`, которое проверяется
+без блокировки записи, после чего `SET NOT NULL` не сканирует таблицу (PostgreSQL 12+).
+"""
+from typing import Iterator
+
+import sqlalchemy as sa
+from alembic import op
+
+from config import config
+
+MAX_ID = 2 ** 63 - 1
+
+
+def _id_ranges(table: str) -> Iterator[tuple[int, int]]:
+    """Полуинтервалы `[start, stop)` по id таблицы размером `DB_MIGRATION_BATCH_SIZE`"""
+    low, high = op.get_bind().execute(sa.text(f"SELECT MIN(id), MAX(id) FROM {table}")).one()
+    if low is None:
+        return
+    for start in range(low, high + 1, config.DB_MIGRATION_BATCH_SIZE):
+        yield start, start + config.DB_MIGRATION_BATCH_SIZE
+
+
+def backfill(table: str, statement: str) -> None:
+    """
+    Выполнить UPDATE `statement` порциями по id таблицы `table`.
+
+    Запрос должен ограничивать строки условием `id >= :start AND id < :stop`. При генерации SQL без
+    подключения к базе (`alembic upgrade --sql`) выводится один запрос на всю таблицу.
+    """
+    with op.get_context().autocommit_block():
+        if op.get_context().as_sql:
+            op.execute(sa.text(statement).bindparams(start=0, stop=MAX_ID))
+            return
+        for start, stop in _id_ranges(table):
+            op.execute(sa.text(statement).bindparams(start=start, stop=stop))
+
+
+def set_not_null(table: str, *columns: str) -> None:
+    """Запретить NULL в заполненных колонках, не сканируя таблицу под эксклюзивной блокировкой"""
+    if op.get_context().dialect.name != "postgresql":
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.BigInteger(), nullable=False)
+        return
+
+    with op.get_context().autocommit_block():
+        for column in columns:
+            name = f"ck_{table}_{column}_not_null"
+            op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({column} IS NOT NULL) NOT VALID")
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+            op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+
+
+def drop_not_null(table: str, *columns: str) -> None:
+    with op.batch_alter_table(table) as batch_op:
+        for column in columns:
+            batch_op.alter_column(column, existing_type=sa.BigInteger(), nullable=True)
@@ -0,0 +1,49 @@
+"""task revisions, timestamps, soft delete and counters
+
+Колонки для синхронизации изменений (`users.task_revision`, `tasks.revision`, `created_at`, `updated_at`,
+`deleted_at`) и счётчики задач пользователя. Миграция только добавляет колонки: на PostgreSQL 11+ колонки
+с постоянным или stable-значением по умолчанию (`0`, `now()`) добавляются без перезаписи таблицы,
+эксклюзивная блокировка держится доли секунды. Ревизии и счётчики заполняются в 0003 и 0005 порциями,
+до этого колонки, которые заполняются, допускают NULL.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    for name in ("task_revision", "task_count", "task_completed_count"):
+        op.add_column("users", sa.Column(name, sa.BigInteger(), nullable=True, server_default="0"))
+
+    # SQLite не добавляет через ALTER TABLE колонки с default CURRENT_TIMESTAMP: таблица пересоздаётся
+    with op.batch_alter_table("tasks", recreate="always" if dialect == "sqlite" else "auto") as batch_op:
+        batch_op.add_column(sa.Column("revision", sa.BigInteger(), nullable=True, server_default="0"))
+        batch_op.add_column(sa.Column("created_at", sa.DateTime(timezone=True), nullable=False,
+                                      server_default=sa.func.now()))
+        batch_op.add_column(sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False,
+                                      server_default=sa.func.now()))
+        batch_op.add_column(sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("tasks") as batch_op:
+        for name in ("deleted_at", "updated_at", "created_at", "revision"):
+            batch_op.drop_column(name)
+    with op.batch_alter_table("users") as batch_op:
+        for name in ("task_completed_count", "task_count", "task_revision"):
+            batch_op.drop_column(name)
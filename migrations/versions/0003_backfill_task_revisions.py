@@ -0,0 +1,32 @@
+"""backfill task revisions
+
+Существующие задачи получают ревизию, равную id. Заполнение идёт порциями по `DB_MIGRATION_BATCH_SIZE` задач,
+каждая порция фиксируется отдельно, поэтому запись в `tasks` не блокируется на время всего прохода.
+Задачи, добавленные предыдущей версией приложения во время миграции, получают ревизию 0 по умолчанию
+и попадают в следующие порции. После заполнения колонке запрещается NULL.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 10:07:00.000000
+
+"""
+from typing import Sequence, Union
+
+from migrations.online import backfill, drop_not_null, set_not_null
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    backfill("tasks", "UPDATE tasks SET revision = id "
+                      "WHERE id >= :start AND id < :stop AND (revision = 0 OR revision IS NULL)")
+    set_not_null("tasks", "revision")
+
+
+def downgrade() -> None:
+    drop_not_null("tasks", "revision")
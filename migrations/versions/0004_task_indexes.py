@@ -0,0 +1,50 @@
+"""indexes for task queries, built online
+
+Индексы под запросы задач пользователя:
+- `ix_tasks_user_id_id` - список задач по id с keyset-пагинацией без фильтра по статусу;
+- `ix_tasks_user_id_status_id` - тот же список с фильтром по статусу (покрывает и `(user_id, status)`);
+- `ix_tasks_user_id_revision` - выборка изменений после ревизии клиента. Индекс не частичный и начинается
+  с `user_id`, поэтому он же служит индексом внешнего ключа `tasks.user_id` и ускоряет пересчёт
+  счётчиков пользователей в 0005.
+Индексы списка частичные: удалённые задачи (tombstones) в них не попадают.
+
+На PostgreSQL индексы строятся `CREATE INDEX CONCURRENTLY` вне транзакции и не блокируют запись в `tasks`.
+Если построение прервалось, PostgreSQL оставляет невалидный индекс: его нужно удалить
+(`DROP INDEX CONCURRENTLY ...`) и повторить миграцию.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 10:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ALIVE = sa.text("deleted_at IS NULL")
+
+INDEXES = (
+    ("ix_tasks_user_id_id", ["user_id", "id"], {"postgresql_where": ALIVE, "sqlite_where": ALIVE}),
+    ("ix_tasks_user_id_status_id", ["user_id", "status", "id"], {"postgresql_where": ALIVE, "sqlite_where": ALIVE}),
+    ("ix_tasks_user_id_revision", ["user_id", "revision"], {}),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns, options in INDEXES:
+            op.create_index(name, "tasks", columns, if_not_exists=True, postgresql_concurrently=True, **options)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="tasks", if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,42 @@
+"""backfill user task revisions and counters
+
+Последняя выделенная ревизия и счётчики задач пользователя пересчитываются по таблице задач порциями
+по `DB_MIGRATION_BATCH_SIZE` пользователей, каждая порция фиксируется отдельно. Подзапросы идут по индексу
+`ix_tasks_user_id_revision` из 0004. После заполнения колонкам запрещается NULL.
+
+Если во время миграции задачи продолжала менять предыдущая версия приложения, счётчики можно сверить
+повторно: `UserInDB.recount_tasks`.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 10:12:00.000000
+
+"""
+from typing import Sequence, Union
+
+from migrations.online import backfill, drop_not_null, set_not_null
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ("task_revision", "task_count", "task_completed_count")
+
+
+def upgrade() -> None:
+    backfill("users", (
+        "UPDATE users SET "
+        "task_revision = COALESCE((SELECT MAX(revision) FROM tasks WHERE tasks.user_id = users.id), 0), "
+        "task_count = (SELECT COUNT(*) FROM tasks WHERE tasks.user_id = users.id AND deleted_at IS NULL), "
+        "task_completed_count = (SELECT COUNT(*) FROM tasks "
+        "WHERE tasks.user_id = users.id AND deleted_at IS NULL AND status) "
+        "WHERE id >= :start AND id < :stop"
+    ))
+    set_not_null("users", *COLUMNS)
+
+
+def downgrade() -> None:
+    drop_not_null("users", *COLUMNS)
@@ -0,0 +1,73 @@
+"""full-text search on tasks
+
+PostgreSQL: generated-колонка `search_vector` и GIN-индекс `ix_tasks_search_vector`. SQLite: внешняя
+FTS5-таблица `tasks_fts`, которую поддерживают триггеры, и её первоначальное заполнение.
+
+Блокировка на PostgreSQL: добавление STORED generated-колонки переписывает всю таблицу `tasks` под
+ACCESS EXCLUSIVE, на это время блокируются и чтение, и запись задач; длительность пропорциональна размеру
+таблицы. Поэтому шаг вынесен в отдельную миграцию, которую можно выполнить в окно обслуживания. Ожидание
+блокировки ограничено `lock_timeout` (5 с), чтобы миграция, стоящая в очереди за долгой транзакцией,
+не останавливала все запросы к `tasks`; при ошибке миграцию нужно повторить. GIN-индекс строится
+`CREATE INDEX CONCURRENTLY` уже без блокировки записи.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 10:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from config import config
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts "
+    "USING fts5(title, description, content='tasks', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("SET LOCAL lock_timeout = '5s'")
+        op.execute(
+            "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+            f"to_tsvector('{config.TASK_SEARCH_CONFIG}'::regconfig, "
+            "coalesce(title, '') || ' ' || coalesce(description, ''))) STORED"
+        )
+        with op.get_context().autocommit_block():
+            op.create_index("ix_tasks_search_vector", "tasks", ["search_vector"], if_not_exists=True,
+                            postgresql_using="gin", postgresql_concurrently=True)
+    elif dialect == "sqlite":
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            op.drop_index("ix_tasks_search_vector", table_name="tasks", if_exists=True,
+                          postgresql_concurrently=True)
+        op.drop_column("tasks", "search_vector")
+    elif dialect == "sqlite":
+        for name in ("tasks_fts_au", "tasks_fts_ad", "tasks_fts_ai"):
+            op.execute(f"DROP TRIGGER {name}")
+        op.execute("DROP TABLE tasks_fts")
@@ -0,0 +1,53 @@
+"""
+Общие фикстуры тестов.
+
+Приложение поднимается в процессе тестов поверх SQLite (aiosqlite) и fakeredis, внешние сервисы не нужны.
+Переменные окружения задаются до импорта приложения: настройки читаются при импорте `config`.
+"""
+import os
+import tempfile
+import uuid
+
+_db_path = os.path.join(tempfile.mkdtemp(prefix="task_manager_tests_"), "tests.db")
+os.environ["URL_DB"] = f"sqlite+aiosqlite:///{_db_path}"
+os.environ["URL_DB_REPLICAS"] = ""
+os.environ["DB_MIGRATE_ON_STARTUP"] = "true"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import fakeredis
+import httpx
+import pytest
+
+import database.redis
+from app.main import app
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    """Клиент к приложению с пустым Redis; база общая для всех тестов, пользователи у тестов свои"""
+    database.redis.redis_instance = fakeredis.FakeAsyncRedis(decode_responses=True)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http_client:
+            yield http_client
+
+
+async def register_and_login(client: httpx.AsyncClient, username: str = None, password: str = "secret123") -> dict:
+    """Зарегистрировать пользователя с уникальным именем и вернуть ответ /auth/login"""
+    username = username or f"user_{uuid.uuid4().hex[:12]}"
+    response = await client.post("/auth/register", json={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    response = await client.post("/auth/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+async def auth_headers(client) -> dict:
+    tokens = await register_and_login(client)
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
@@ -0,0 +1,53 @@
+import pytest
+
+from tests.conftest import register_and_login
+
+pytestmark = pytest.mark.anyio
+
+
+async def refresh(client, refresh_token: str):
+    return await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+
+async def test_refresh_rotates_token(client):
+    tokens = await register_and_login(client)
+
+    response = await refresh(client, tokens["refresh_token"])
+
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert (await client.get("/tasks", headers={"Authorization": f"Bearer {rotated['access_token']}"})).status_code == 200
+
+
+async def test_refresh_token_reuse_revokes_family(client):
+    tokens = await register_and_login(client)
+    rotated = (await refresh(client, tokens["refresh_token"])).json()
+
+    # Повторное предъявление заменённого токена отзывает семейство, в том числе действующий токен
+    assert (await refresh(client, tokens["refresh_token"])).status_code == 401
+    assert (await refresh(client, rotated["refresh_token"])).status_code == 401
+
+
+async def test_reuse_does_not_revoke_other_families(client):
+    first = await register_and_login(client, username="multi_device_user")
+    second = (await client.post("/auth/login", data={"username": "multi_device_user",
+                                                     "password": "secret123"})).json()
+    await refresh(client, first["refresh_token"])
+
+    assert (await refresh(client, first["refresh_token"])).status_code == 401
+    assert (await refresh(client, second["refresh_token"])).status_code == 200
+
+
+async def test_access_token_is_not_accepted_as_refresh_token(client):
+    tokens = await register_and_login(client)
+
+    assert (await refresh(client, tokens["access_token"])).status_code == 401
+
+
+async def test_refresh_token_is_not_accepted_as_access_token(client):
+    tokens = await register_and_login(client)
+
+    response = await client.get("/tasks", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+
+    assert response.status_code == 401
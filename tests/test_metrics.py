@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+from app import metrics
+from config import config
+
+DEAD_PID = 2 ** 22 + 1  # больше максимального pid в Linux
+
+
+@pytest.fixture
+def registry():
+    """Тестовые метрики; после теста удаляются из общего реестра"""
+    registered = len(metrics.REGISTRY)
+    counter = metrics.Counter("test_events_total", "Test events", ("kind",))
+    histogram = metrics.Histogram("test_duration_seconds", "Test durations", buckets=(0.1, 1.0))
+    gauge = metrics.GaugeCollector("test_pool", "Test pool", lambda: {"size": 3})
+    yield counter, histogram, gauge
+    del metrics.REGISTRY[registered:]
+
+
+def test_render_aggregates_worker_snapshots(registry, tmp_path, monkeypatch):
+    counter, histogram, _ = registry
+    monkeypatch.setattr(config, "METRICS_MULTIPROCESS_DIR", str(tmp_path))
+    counter.inc("a", amount=2)
+    histogram.observe(0.05)
+    # Снимок завершившегося воркера: счётчики учитываются, gauge-метрики нет
+    (tmp_path / f"{DEAD_PID}.json").write_text(json.dumps({
+        "test_events_total": [[["a"], 3.0], [["b"], 1.0]],
+        "test_duration_seconds": [[[], [0, 1], 2.5, 2]],
+        "test_pool": [[[], "size", 7]],
+    }))
+
+    lines = metrics.render().splitlines()
+
+    assert 'test_events_total{kind="a"} 5.0' in lines
+    assert 'test_events_total{kind="b"} 1.0' in lines
+    assert 'test_duration_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_duration_seconds_bucket{le="1.0"} 2' in lines
+    assert 'test_duration_seconds_bucket{le="+Inf"} 3' in lines
+    assert "test_duration_seconds_count 3" in lines
+    assert f'test_pool_size{{pid="{os.getpid()}"}} 3' in lines
+    assert not any(line.startswith(f'test_pool_size{{pid="{DEAD_PID}"}}') for line in lines)
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+
+
+def test_render_without_directory_is_process_local(registry, monkeypatch):
+    counter, _, _ = registry
+    monkeypatch.setattr(config, "METRICS_MULTIPROCESS_DIR", "")
+    counter.inc("a")
+
+    lines = metrics.render().splitlines()
+
+    assert 'test_events_total{kind="a"} 1.0' in lines
+    assert "test_pool_size 3" in lines
@@ -0,0 +1,45 @@
+import uuid
+
+import pytest
+
+from app.rate_limit import Budget
+from config import config
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def rate_limit_enabled(monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT_ENABLED", True)
+
+
+async def login(client, username: str, password: str = "wrong-password"):
+    return await client.post("/auth/login", data={"username": username, "password": password})
+
+
+def test_budget_parse():
+    assert Budget.parse("10/minute") == Budget(10, 60)
+    assert Budget.parse("100/3600") == Budget(100, 3600.0)
+
+
+async def test_login_attempts_per_username_are_limited(client, rate_limit_enabled):
+    username = f"victim_{uuid.uuid4().hex[:12]}"
+    limit = Budget.parse(config.RATE_LIMIT_LOGIN_PER_USERNAME).limit
+
+    for _ in range(limit):
+        assert (await login(client, username)).status_code == 401
+
+    response = await login(client, username)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Бюджет считается по имени пользователя: другие имена с того же адреса не затронуты
+    assert (await login(client, f"other_{uuid.uuid4().hex[:12]}")).status_code == 401
+
+
+async def test_rate_limit_disabled(client):
+    username = f"user_{uuid.uuid4().hex[:12]}"
+    limit = Budget.parse(config.RATE_LIMIT_LOGIN_PER_USERNAME).limit
+
+    for _ in range(limit + 1):
+        assert (await login(client, username)).status_code == 401
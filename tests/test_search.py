@@ -0,0 +1,58 @@
+import pytest
+
+from database.mod import SearchTerm, Task
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("milk", [[SearchTerm(("milk",))]]),
+    ("  milk   bread ", [[SearchTerm(("milk",)), SearchTerm(("bread",))]]),
+    ("mil*", [[SearchTerm(("mil",), prefix=True)]]),
+    ("milk -buy", [[SearchTerm(("milk",)), SearchTerm(("buy",), negated=True)]]),
+    ('"buy milk" -"sour cream"', [[SearchTerm(("buy", "milk")), SearchTerm(("sour", "cream"), negated=True)]]),
+    ("milk OR bread", [[SearchTerm(("milk",))], [SearchTerm(("bread",))]]),
+    ('"unclosed phrase', [[SearchTerm(("unclosed", "phrase"))]]),
+    ("milk or -bread", [[SearchTerm(("milk",))]]),
+])
+def test_search_terms(query, expected):
+    assert Task._search_terms(query) == expected
+
+
+@pytest.mark.parametrize("query", ["", "   ", "*", "** * -", '""', "-milk", "or"])
+def test_search_terms_without_positive_terms(query):
+    assert Task._search_terms(query) == []
+
+
+def test_backend_queries_are_built_from_same_terms():
+    groups = Task._search_terms('"buy milk" mil* -sour or it\'s')
+
+    assert Task._tsquery(groups) == "(('buy' <-> 'milk') & 'mil':* & !'sour') | ('it''s')"
+    assert Task._fts5_query(groups) == '(("buy milk" AND "mil"*) NOT ("sour")) OR ("it\'s")'
+
+
+async def create(client, headers, title: str, description: str = None) -> int:
+    response = await client.post("/tasks", json={"title": title, "description": description}, headers=headers)
+    return response.json()["id"]
+
+
+async def search(client, headers, q: str) -> set[int]:
+    response = await client.get("/tasks/search", params={"q": q}, headers=headers)
+    assert response.status_code == 200, response.text
+    return {task["id"] for task in response.json()}
+
+
+async def test_search_syntax(client, auth_headers):
+    buy_milk = await create(client, auth_headers, "buy milk", "two bottles")
+    milk_shake = await create(client, auth_headers, "milkshake")
+    bread = await create(client, auth_headers, "bread", "milk is already bought")
+    other = await create(client, auth_headers, "call mom")
+
+    assert await search(client, auth_headers, "milk") == {buy_milk, bread}
+    assert await search(client, auth_headers, "milk -buy") == {bread}
+    assert await search(client, auth_headers, "mil*") == {buy_milk, milk_shake, bread}
+    assert await search(client, auth_headers, '"buy milk"') == {buy_milk}
+    assert await search(client, auth_headers, '"milk buy"') == set()
+    assert await search(client, auth_headers, "milkshake or mom") == {milk_shake, other}
+    assert await search(client, auth_headers, "-milk") == set()
+    assert await search(client, auth_headers, 'AND NOT "(" title:x') == set()
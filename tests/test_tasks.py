@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from database.db import async_session
+from database.mod import Task, UserInDB
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_tasks(client, headers, count: int, **fields) -> list[dict]:
+    response = await client.post("/tasks/batch", json=[dict(fields, title=f"task {i}") for i in range(count)],
+                                 headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def stats(client, headers) -> dict:
+    return (await client.get("/tasks/stats", headers=headers)).json()
+
+
+async def sync(client, headers, since: int, limit: int) -> tuple[int, set[int], set[int]]:
+    """Пройти все страницы /tasks/changes начиная с `since`, вернуть ревизию и id изменённых и удалённых задач"""
+    upserts, deleted = set(), set()
+    while True:
+        page = (await client.get("/tasks/changes", params={"since": since, "limit": limit}, headers=headers)).json()
+        upserts.update(task["id"] for task in page["upserts"])
+        deleted.update(page["deleted"])
+        assert page["revision"] >= since
+        since = page["revision"]
+        if not page["has_more"]:
+            return since, upserts - deleted, deleted
+
+
+async def test_changes_paging_across_deletes(client, auth_headers):
+    tasks = await create_tasks(client, auth_headers, 7)
+    ids = [task["id"] for task in tasks]
+
+    revision, upserts, deleted = await sync(client, auth_headers, 0, limit=3)
+    assert upserts == set(ids) and not deleted
+
+    await client.put(f"/tasks/{ids[0]}", json={"title": "renamed"}, headers=auth_headers)
+    await client.request("DELETE", "/tasks/batch", json={"ids": ids[1:4]}, headers=auth_headers)
+    await client.delete(f"/tasks/{ids[4]}", headers=auth_headers)
+
+    next_revision, upserts, deleted = await sync(client, auth_headers, revision, limit=2)
+    assert next_revision > revision
+    assert upserts == {ids[0]}
+    assert deleted == set(ids[1:5])
+
+    page = (await client.get("/tasks/changes", params={"since": next_revision}, headers=auth_headers)).json()
+    assert page == {"revision": next_revision, "has_more": False, "upserts": [], "deleted": []}
+
+
+async def test_changes_page_boundary_has_more(client, auth_headers):
+    await create_tasks(client, auth_headers, 4)
+
+    first = (await client.get("/tasks/changes", params={"limit": 4}, headers=auth_headers)).json()
+    assert len(first["upserts"]) == 4 and first["has_more"] is False
+
+    second = (await client.get("/tasks/changes", params={"limit": 3}, headers=auth_headers)).json()
+    assert len(second["upserts"]) == 3 and second["has_more"] is True
+
+
+async def test_counters_follow_writes(client, auth_headers):
+    tasks = await create_tasks(client, auth_headers, 3)
+    created = (await client.post("/tasks", json={"title": "done", "status": True}, headers=auth_headers)).json()
+    assert await stats(client, auth_headers) == {"total": 4, "completed": 1, "open": 3}
+
+    await client.put(f"/tasks/{tasks[0]['id']}", json={"status": True}, headers=auth_headers)
+    await client.put(f"/tasks/{tasks[0]['id']}", json={"status": True}, headers=auth_headers)
+    assert await stats(client, auth_headers) == {"total": 4, "completed": 2, "open": 2}
+
+    response = await client.patch("/tasks/batch", json=[
+        {"id": tasks[1]["id"], "status": True},
+        {"id": created["id"], "status": False},
+        {"id": tasks[2]["id"], "title": "renamed"},
+        {"id": 10 ** 9, "status": True},
+    ], headers=auth_headers)
+    assert [item["ok"] for item in response.json()] == [True, True, True, False]
+    assert await stats(client, auth_headers) == {"total": 4, "completed": 2, "open": 2}
+
+    body = '{"title": "a", "status": true}\n{"title": "b"}\n{"status": true}\n'
+    response = await client.post("/tasks/import", content=body, headers=dict(auth_headers,
+                                                                            **{"Content-Type": "application/x-ndjson"}))
+    assert response.json()["imported"] == 2
+    assert await stats(client, auth_headers) == {"total": 6, "completed": 3, "open": 3}
+
+    await client.delete(f"/tasks/{tasks[0]['id']}", headers=auth_headers)
+    await client.delete(f"/tasks/{tasks[0]['id']}", headers=auth_headers)
+    await client.request("DELETE", "/tasks/batch", json={"ids": [tasks[1]["id"], tasks[2]["id"], 10 ** 9]},
+                         headers=auth_headers)
+    assert await stats(client, auth_headers) == {"total": 3, "completed": 1, "open": 2}
+
+
+async def test_concurrent_writes_are_counted_once(client, auth_headers):
+    task = (await create_tasks(client, auth_headers, 1))[0]
+    user_id = task["user_id"]
+
+    async def update(values: dict):
+        async with async_session() as session:
+            return await Task.update_returning(session, task["id"], values, user_id=user_id)
+
+    async def delete():
+        async with async_session() as session:
+            return await Task.delete_returning(session, task["id"], user_id=user_id)
+
+    # Обе транзакции меняют один статус: второе изменение видит результат первого и счётчик не трогает
+    await asyncio.gather(update({"status": True}), update({"status": True}))
+    async with async_session() as session:
+        assert dict(await UserInDB.get_task_counts(session, user_id)) == {"task_count": 1, "task_completed_count": 1}
+
+    # Задача удаляется ровно одной из транзакций
+    assert sorted(await asyncio.gather(delete(), delete()), key=str) == [task["id"], None]
+    async with async_session() as session:
+        assert dict(await UserInDB.get_task_counts(session, user_id)) == {"task_count": 0, "task_completed_count": 0}